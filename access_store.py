@@ -0,0 +1,187 @@
+"""Non-blocking wrapper around the user_access collection.
+
+pymongo is synchronous, so every call goes through a small dedicated thread
+pool instead of running on the gateway loop. connect() imports pymongo and
+waits for server selection in that pool too, so the bot can do both while
+the gateway login is in flight. A collection can also be passed in directly,
+which keeps this usable against mongomock or a throwaway local mongod.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import migrations
+from metrics import metrics
+
+DUPLICATE_KEY = 11000
+
+
+class NotConnected(Exception):
+    # Raised by the store methods while connect() is still in flight, and by
+    # core.has_access until the first refresh has loaded the cache.
+    pass
+
+
+def create_client(uri: str, pool_size: int = 10, timeout_ms: int = 5000):
+    # MongoClient connects lazily; the ping in AccessStore.connect waits for it.
+    from pymongo import MongoClient
+    return MongoClient(
+        uri,
+        maxPoolSize=pool_size,
+        timeoutMS=timeout_ms,
+        serverSelectionTimeoutMS=timeout_ms,
+        connectTimeoutMS=timeout_ms,
+    )
+
+
+class AccessStore:
+    # User ids are stored as int64 under a unique index (see migrations.py).
+    # Every read filters on a userId range and projects only userId, so Mongo
+    # answers it from the index without touching documents.
+    ALL = {"userId": {"$gte": 0}}
+    PROJECTION = {"_id": 0, "userId": 1}
+
+    def __init__(self, collection=None, workers: int = 4):
+        self.collection = collection
+        self.db = collection.database if collection is not None else None
+        self.cache = set()
+        # Set by the first successful refresh(); until then the cache is empty
+        # rather than authoritative.
+        self.loaded = asyncio.Event()
+        # Called after every grant/revoke, e.g. to tell other processes.
+        self.on_change = None
+        self._writes = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="access-store")
+
+    def __contains__(self, user_id) -> bool:
+        return int(user_id) in self.cache
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        with metrics.stage("mongo"):
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    def _connected(self):
+        # The collection, once connect() has set it.
+        if self.collection is None:
+            raise NotConnected("the access store isn't connected yet")
+        return self.collection
+
+    def _changed(self):
+        self._writes += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    @staticmethod
+    def _ids(user_ids) -> list:
+        return list(dict.fromkeys(int(u) for u in user_ids))
+
+    @staticmethod
+    def _connect(uri: str, pool_size: int, timeout_ms: int):
+        client = create_client(uri, pool_size=pool_size, timeout_ms=timeout_ms)
+        client.admin.command("ping")  # server selection and the first connection
+        return client
+
+    async def connect(self, uri: str, database: str, pool_size: int = 10, timeout_ms: int = 5000):
+        client = await self._run(self._connect, uri, pool_size, timeout_ms)
+        self.db = client[database]
+        self.collection = self.db["user_access"]
+
+    async def migrate(self, db) -> list:
+        return await self._run(migrations.migrate, db)
+
+    async def migrations_pending(self, db) -> bool:
+        return await self._run(migrations.pending, db)
+
+    def _load_ids(self) -> list:
+        return [doc["userId"] for doc in self.collection.find(self.ALL, self.PROJECTION)]
+
+    async def refresh(self) -> bool:
+        writes = self._writes
+        self._connected()
+        ids = await self._run(self._load_ids)
+        if writes != self._writes:
+            # a grant/revoke landed mid-fetch; the snapshot may predate it
+            return False
+        self.cache.clear()
+        self.cache.update(ids)
+        self.loaded.set()
+        return True
+
+    async def count(self) -> int:
+        return await self._run(self._connected().count_documents, self.ALL)
+
+    def _load_page(self, after, before, limit: int) -> list:
+        # Keyset pagination on the userId index: one page per query, no skip().
+        if before is not None:
+            cursor = self.collection.find({"userId": {"$gte": 0, "$lt": before}}, self.PROJECTION)
+            docs = list(cursor.sort("userId", -1).limit(limit))
+            docs.reverse()
+        else:
+            query = {"userId": {"$gt": after}} if after is not None else self.ALL
+            cursor = self.collection.find(query, self.PROJECTION)
+            docs = list(cursor.sort("userId", 1).limit(limit))
+        return [doc["userId"] for doc in docs]
+
+    async def page(self, after=None, before=None, limit: int = 10) -> list:
+        # Ids following `after`, or the page ending just before `before`.
+        self._connected()
+        return await self._run(self._load_page, after, before, limit)
+
+    def _insert(self, user_id: int) -> bool:
+        from pymongo.errors import DuplicateKeyError
+        try:
+            self.collection.insert_one({"userId": user_id})
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def grant(self, user_id) -> bool:
+        # The unique index makes this idempotent; a duplicate means "already had it".
+        user_id = int(user_id)
+        self._connected()
+        inserted = await self._run(self._insert, user_id)
+        self._changed()
+        self.cache.add(user_id)
+        return inserted
+
+    async def revoke(self, user_id) -> bool:
+        user_id = int(user_id)
+        result = await self._run(self._connected().delete_one, {"userId": user_id})
+        self._changed()
+        self.cache.discard(user_id)
+        return result.deleted_count > 0
+
+    def _insert_many(self, ids: list) -> int:
+        from pymongo.errors import BulkWriteError
+        try:
+            return len(self.collection.insert_many([{"userId": u} for u in ids], ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                raise
+            return e.details.get("nInserted", 0)
+
+    async def grant_many(self, user_ids) -> int:
+        ids = self._ids(user_ids)
+        if not ids:
+            return 0
+        self._connected()
+        inserted = await self._run(self._insert_many, ids)
+        self._changed()
+        self.cache.update(ids)
+        return inserted
+
+    async def revoke_many(self, user_ids) -> int:
+        ids = self._ids(user_ids)
+        if not ids:
+            return 0
+        result = await self._run(self._connected().delete_many, {"userId": {"$in": ids}})
+        self._changed()
+        self.cache.difference_update(ids)
+        return result.deleted_count
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,237 @@
+"""The bot itself: events, startup, and the /reload and /sync commands.
+
+main.py imports this inside main() rather than at module level, so the image
+workers, which run main.py again as __mp_main__, never load discord.py, core
+or a second bot.
+"""
+import startup
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+import asyncio, hashlib, json, os, subprocess
+import config
+import metrics
+from core import (
+    BOT_PM2_ID, GODS, MONGO_DATABASE, MONGO_OPTIONS, PRIMARY_PROCESS, PROCESS_INDEX, SHARED_STATE_POLL_SECONDS,
+    TOKEN, access, bot, check_memory, command_cooldown, create_http_session, image_worker, loop_watchdog,
+    memory_guard, reconcile_access_cache, shared_state, sweep_rate_limits, warm_imaging,
+)
+startup.mark("imports")
+
+# Command modules. /reload swaps these in place; the gateway connection, HTTP
+# session, Mongo pool, caches and worker pool in `core` stay up throughout.
+EXTENSIONS = ("cogs.admin", "cogs.info", "cogs.faq", "cogs.imaging")
+
+# ------------------ COMMAND SYNC ------------------
+# Global syncs are heavily rate limited, so the tree is only pushed when its
+# payload differs from what was last synced. The hash of that payload is kept
+# on disk so restarts don't resync either.
+COMMAND_HASH_PATH = getattr(config, "COMMAND_HASH_PATH", "cache/command_tree.sha256")
+
+def command_tree_hash() -> str:
+    payload = sorted(
+        (command.to_dict(bot.tree) for command in bot.tree.get_commands()),
+        key=lambda data: (data.get("type", 1), data["name"]),
+    )
+    blob = json.dumps([bot.application_id, payload], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def read_synced_hash():
+    try:
+        with open(COMMAND_HASH_PATH) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def write_synced_hash(digest: str):
+    os.makedirs(os.path.dirname(COMMAND_HASH_PATH) or ".", exist_ok=True)
+    tmp = f"{COMMAND_HASH_PATH}.tmp"
+    with open(tmp, "w") as f:
+        f.write(digest)
+    os.replace(tmp, COMMAND_HASH_PATH)
+
+async def sync_commands(force: bool = False):
+    # Returns the number of commands synced, or None when nothing changed.
+    digest = command_tree_hash()
+    if not force and digest == read_synced_hash():
+        return None
+    synced = await bot.tree.sync()
+    write_synced_hash(digest)
+    return len(synced)
+
+# ------------------ EVENTS ------------------
+# discord.py calls setup_hook after the HTTP login and opens the gateway once
+# it returns, so it only does what commands need to exist: the session and
+# the extensions. Mongo, the access cache, Pillow and the command sync are
+# handled by finish_startup while the gateway handshake is in flight.
+@bot.event
+async def setup_hook():
+    startup.mark("login")
+    if loop_watchdog is not None:
+        loop_watchdog.start(asyncio.get_running_loop())
+    bot.session = create_http_session()
+    for name in EXTENSIONS:
+        await bot.load_extension(name)
+    startup.mark("extensions")
+    sweep_rate_limits.start()
+    if memory_guard is not None:
+        check_memory.start()
+    metrics_port = getattr(config, "METRICS_PORT", None)
+    if metrics_port:
+        metrics_port += PROCESS_INDEX  # one port per process under launcher.py
+        bot.metrics_runner = await metrics.serve(metrics_port)
+        print(f"Metrics on http://127.0.0.1:{metrics_port}/metrics")
+    bot.startup_task = asyncio.create_task(finish_startup())
+
+async def load_access():
+    await access.connect(config.MONGO_URI, MONGO_DATABASE, **MONGO_OPTIONS)
+    startup.mark("mongo")
+    if PRIMARY_PROCESS:
+        for step in await access.migrate(access.db):
+            print(f"Applied migration: {step}")
+    else:
+        # the primary migrates; don't load ids still in the old format
+        while await access.migrations_pending(access.db):
+            await asyncio.sleep(1)
+    # False means a grant/revoke raced the fetch; the next one will see it
+    while not await access.refresh():
+        pass
+    startup.mark("access")
+    print(f"Loaded {len(access)} access entries.")
+
+async def load_imaging():
+    await asyncio.to_thread(warm_imaging)
+    startup.mark("pillow")
+
+async def finish_startup():
+    if shared_state is not None:
+        # first look records the current versions; later changes trigger work
+        shared_state.changed("access")
+        shared_state.changed("extensions")
+    try:
+        await asyncio.gather(load_access(), load_imaging())
+    except Exception as e:
+        # Without the access list every gated command would refuse; exit and
+        # let PM2 restart us, like a failure in setup_hook used to.
+        print(f"Startup failed: {e}")
+        await bot.close()
+        return
+    reconcile_access_cache.start()
+    if shared_state is not None:
+        watch_shared_state.start()
+    if PRIMARY_PROCESS:
+        try:
+            synced = await sync_commands()
+            print("Command tree unchanged, skipped sync." if synced is None else f"Synced {synced} commands.")
+        except Exception as e:
+            print(f"Sync failed: {e}")
+    await bot.wait_until_ready()
+    print(f"Startup: {startup.summary()}")
+
+# Set when another process changed the access list and we haven't reloaded
+# it yet; a refresh that raced one of our own writes or failed is retried
+# next tick.
+access_refresh_pending = False
+
+@tasks.loop(seconds=SHARED_STATE_POLL_SECONDS)
+async def watch_shared_state():
+    # Picks up what the other processes changed: access grants and revokes,
+    # and /reload (which reloads every extension here). Errors are logged
+    # rather than raised, since tasks.loop stops for good on most of them.
+    global access_refresh_pending
+    if shared_state.changed("access"):
+        access_refresh_pending = True
+    if access_refresh_pending:
+        try:
+            access_refresh_pending = not await access.refresh()
+        except Exception as e:
+            print(f"Access cache refresh failed: {e}")
+    if shared_state.changed("extensions"):
+        try:
+            for error in await reload_extensions(EXTENSIONS):
+                print(f"Reload requested by another process failed: {error}")
+        except Exception as e:
+            print(f"Reload requested by another process failed: {e}")
+
+@bot.event
+async def on_ready():
+    # Fires again on every reconnect, so nothing expensive belongs here.
+    startup.mark("ready")
+    print(f"Logged in as {bot.user}")
+
+# ------------------ RELOAD / SYNC COMMANDS ------------------
+# Lives here rather than in an extension so it keeps working when one of them
+# fails to load.
+async def reload_extensions(names) -> list:
+    errors = []
+    for name in names:
+        try:
+            try:
+                await bot.reload_extension(name)
+            except commands.ExtensionNotLoaded:
+                await bot.load_extension(name)
+        except commands.ExtensionError as e:
+            # reload_extension rolls back to the old module on failure
+            errors.append(f"> `{name}`: {e.__cause__ or e}")
+    return errors
+
+@bot.tree.command(name="reload", description="Reload the bot's commands (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(
+    module="Only reload this module",
+    restart="Restart the whole process via PM2 instead",
+)
+@app_commands.choices(module=[app_commands.Choice(name=name.split(".")[-1], value=name) for name in EXTENSIONS])
+@command_cooldown
+async def reload_bot(interaction: discord.Interaction, module: str = None, restart: bool = False):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You aren't authorized to reload the bot.", ephemeral=True)
+
+    if restart:
+        # Send confirmation before restarting
+        await interaction.response.send_message("> Bot reload has been triggered. Restarting via PM2 now...", ephemeral=True)
+
+        try:
+            # Run PM2 restart using ID and shell=True for Windows compatibility
+            subprocess.Popen(f"pm2 restart {BOT_PM2_ID}", shell=True)
+        except Exception as e:
+            await interaction.followup.send(f"> Failed to restart: `{e}`", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+
+    names = [module] if module else EXTENSIONS
+    errors = await reload_extensions(names)
+    if errors:
+        return await interaction.followup.send("> Reload failed, kept the old version:\n" + "\n".join(errors), ephemeral=True)
+
+    message = f"> Reloaded {', '.join(f'`{name}`' for name in names)}."
+    if shared_state is not None:
+        shared_state.bump("extensions")  # the other shard processes follow
+    try:
+        # only hits the API if a command's name, options or description changed
+        synced = await sync_commands()
+        if synced is not None:
+            message += f" Synced {synced} commands."
+    except Exception as e:
+        message += f" Sync failed: `{e}`"
+    await interaction.followup.send(message, ephemeral=True)
+
+@bot.tree.command(name="sync", description="Push the slash commands to Discord now (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@command_cooldown
+async def force_sync(interaction: discord.Interaction):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You aren't authorized to sync commands.", ephemeral=True)
+
+    await interaction.response.defer(ephemeral=True)
+    try:
+        synced = await sync_commands(force=True)
+    except Exception as e:
+        return await interaction.followup.send(f"> Sync failed: `{e}`", ephemeral=True)
+    await interaction.followup.send(f"> Synced {synced} commands.", ephemeral=True)
+
+# ------------------ RUN BOT ------------------
+def run():
+    image_worker.start()
+    bot.run(TOKEN)
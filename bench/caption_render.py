@@ -0,0 +1,72 @@
+"""Per-caption render time: the old /caption typesetting against typeset.py.
+
+Run from the repo root:
+
+    python -m bench.caption_render --runs 500
+
+"before" is the old inline code: a truetype("arial.ttf") lookup on every
+call (usually failing over to load_default() on Linux), then a fresh
+textbbox. "after" is images.render_caption_band with the font resolved once.
+Both render the caption band only, without frame compositing or GIF encoding.
+"""
+import argparse
+import statistics
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+import typeset
+from images import render_caption_band
+
+CAPTIONS = [
+    "when the bot finally answers",
+    "me explaining to support that I already restarted Nighty as admin twice",
+    "ok",
+    "POV: you ran the legacy commands script",
+]
+SIZES = [(720, 540), (480, 480), (720, 405)]
+
+
+def old_caption_band(width: int, height: int, text: str):
+    caption_height = max(50, int(height * 0.15))
+    band = Image.new("RGBA", (width, caption_height), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(band)
+    try:
+        font = ImageFont.truetype("arial.ttf", caption_height - 10)
+    except OSError:
+        font = ImageFont.load_default()
+
+    bbox = draw.textbbox((0, 0), text, font=font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    draw.text(((width - text_width) // 2, (caption_height - text_height) // 2), text, font=font, fill="black")
+    return band
+
+
+def bench(name: str, render, runs: int):
+    timings = []
+    for n in range(runs):
+        width, height = SIZES[n % len(SIZES)]
+        text = CAPTIONS[n % len(CAPTIONS)]
+        start = time.perf_counter()
+        render(width, height, text)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:>6}: mean={statistics.mean(timings):.0f}us p50={statistics.median(timings):.0f}us p99={p99:.0f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--font", default=None, help="font for the new path (default: resolve_font())")
+    args = parser.parse_args()
+
+    font_path = typeset.resolve_font(args.font)
+    print(f"font: {font_path or 'Pillow built-in'}")
+    bench("before", old_caption_band, args.runs)
+    bench("after", lambda w, h, text: render_caption_band(w, h, text, font_path), args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""Offline load test for the real command handlers.
+
+Run from the repo root:
+
+    python -m bench.load_test --concurrency 16 --requests 200
+    python -m bench.load_test --scenarios gif,caption --quote-backend local
+
+Nothing external is needed. The bot is built from core.py and cogs/ as
+usual, with a generated config, mongomock in place of MongoDB and
+bench.upstream_stub in place of the quote API and image hosts. Handlers are
+called through the same callbacks Discord would hit, with fake
+Interaction/Attachment/Message objects that record what gets sent.
+
+Each scenario reports throughput, p50/p99 latency (whole call and first
+response), outcomes, event-loop lag while it ran, and peak RSS of this
+process and the image workers. The image corpus is generated from fixed
+seeds, so runs are comparable across commits.
+"""
+import argparse
+import asyncio
+import io
+import random
+import resource
+import sys
+import tempfile
+import time
+import types
+from collections import Counter
+
+import mongomock
+from PIL import Image
+
+from bench.upstream_stub import start_stub
+
+USER_BASE = 100_000_000_000_000_000
+SCENARIOS = ("access", "faq", "about", "gif", "caption", "quote")
+
+
+# ------------------ CORPUS ------------------
+def _noise_image(seed: int, size: tuple) -> Image.Image:
+    # Blocky random colours scaled up: compresses like a real photo would not,
+    # which is the harder case for the encoder.
+    rng = random.Random(seed)
+    small = Image.new("RGB", (size[0] // 16, size[1] // 16))
+    small.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(small.width * small.height)])
+    return small.resize(size, Image.BILINEAR)
+
+
+def build_corpus() -> dict:
+    # name -> (bytes, content type)
+    corpus = {}
+    buf = io.BytesIO()
+    _noise_image(1, (800, 600)).save(buf, "PNG")
+    corpus["photo.png"] = (buf.getvalue(), "image/png")
+
+    buf = io.BytesIO()
+    _noise_image(2, (1920, 1080)).save(buf, "JPEG", quality=85)
+    corpus["large.jpg"] = (buf.getvalue(), "image/jpeg")
+
+    frames = [_noise_image(10 + i, (480, 270)) for i in range(24)]
+    buf = io.BytesIO()
+    frames[0].save(buf, "GIF", save_all=True, append_images=frames[1:], duration=40, loop=0)
+    corpus["clip.gif"] = (buf.getvalue(), "image/gif")
+
+    buf = io.BytesIO()
+    _noise_image(3, (128, 128)).save(buf, "PNG")
+    corpus["avatar.png"] = (buf.getvalue(), "image/png")
+    return corpus
+
+
+# ------------------ FAKE DISCORD OBJECTS ------------------
+class FakeUser:
+    def __init__(self, user_id: int, name: str = "bench"):
+        self.id = user_id
+        self.name = name
+        self.display_name = name.title()
+        self.mention = f"<@{user_id}>"
+        self.avatar = None
+        self.default_avatar = types.SimpleNamespace(url="")
+
+
+class FakeAttachment:
+    def __init__(self, url: str, data: bytes, content_type: str):
+        with Image.open(io.BytesIO(data)) as img:
+            self.width, self.height = img.size
+        self.url = url
+        self.size = len(data)
+        self.content_type = content_type
+
+
+class FakeMessage:
+    def __init__(self, author: FakeUser, content: str):
+        self.author = author
+        self.content = content
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self):
+        await asyncio.sleep(self._interaction.discord_latency)
+        if self._interaction.first_response is None:
+            self._interaction.first_response = time.perf_counter()
+        self._done = True
+
+    async def defer(self, **kwargs):
+        await self._respond()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond()
+        self._interaction.record(content, **kwargs)
+
+    async def edit_message(self, **kwargs):
+        await self._respond()
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(self._interaction.discord_latency)
+        self._interaction.record(content, **kwargs)
+
+
+class FakeInteraction:
+    def __init__(self, client, command, user: FakeUser, discord_latency: float):
+        self.client = client
+        self.command = command
+        self.user = user
+        self.discord_latency = discord_latency
+        self.started = time.perf_counter()
+        self.first_response = None
+        self.outcome = None
+        # command_cooldown only installs its TimedResponse when this is unset
+        self._cs_response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    @property
+    def response(self):
+        return self._cs_response
+
+    def record(self, content=None, file=None, embed=None, ephemeral=False, **kwargs):
+        if self.outcome is not None and self.outcome != "queued":
+            return
+        if file is not None or embed is not None or not ephemeral:
+            self.outcome = "ok"
+        else:
+            self.outcome = (content or "").lstrip("> ")[:48]
+
+    async def edit_original_response(self, **kwargs):
+        await asyncio.sleep(self.discord_latency)
+        self.outcome = "queued"
+
+    async def delete_original_response(self):
+        await asyncio.sleep(self.discord_latency)
+
+
+# ------------------ HARNESS ------------------
+def install_config(args, stub_url: str, cache_dir: str):
+    # core.py reads everything from `config`; this one points at the stub.
+    config = types.ModuleType("config")
+    config.TOKEN = "bench"
+    config.GODS = []
+    config.BOT_PM2_ID = 0
+    config.BOT_NAME_PM2 = "bench"
+    config.MONGO_URI = "mongodb://localhost:27017"
+    config.QUOTE_API_URL = stub_url
+    config.QUOTE_BACKEND = args.quote_backend
+    config.QUOTE_CACHE_DIR = cache_dir
+    config.HEAVY_CONCURRENCY = args.heavy_concurrency
+    config.IMAGE_WORKERS = args.workers
+    if not args.rate_limits:
+        config.RATE_LIMIT_RATE = 1e9
+        config.RATE_LIMIT_BURST = 1e9
+    sys.modules["config"] = config
+
+
+async def sample_lag(samples: list, interval: float = 0.01):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+def _vm_hwm_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def peak_rss_mb(worker) -> tuple:
+    # ru_maxrss is KiB on Linux. RUSAGE_CHILDREN only covers workers that have
+    # exited, so live ones are read from /proc where available.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    pool = worker._pool
+    for pid in (pool._processes or {}) if pool is not None else ():
+        children = max(children, _vm_hwm_mb(pid))
+    return own, children
+
+
+def pct(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Harness:
+    def __init__(self, args, bot, stub, corpus):
+        self.args = args
+        self.bot = bot
+        self.stub = stub
+        self.corpus = corpus
+        self.users = [FakeUser(USER_BASE + i) for i in range(args.users)]
+
+    def interaction(self, name: str, n: int) -> FakeInteraction:
+        command = self.bot.tree.get_command(name) or next(
+            c for c in self.bot.tree.get_commands() if c.name == name
+        )
+        return FakeInteraction(self.bot, command, self.users[n % len(self.users)], self.args.discord_latency / 1000)
+
+    def image(self, n: int) -> FakeAttachment:
+        names = ("photo.png", "large.jpg", "clip.gif")
+        name = names[n % len(names)]
+        data, content_type = self.corpus[name]
+        url = f"{self.stub.url}files/{name}"
+        if not self.args.coalesce:
+            url += f"?n={n}"  # distinct keys, so inflight can't merge requests
+        return FakeAttachment(url, data, content_type)
+
+    async def call(self, scenario: str, n: int) -> FakeInteraction:
+        if scenario == "access":
+            import core
+            started = time.perf_counter()
+            for user in self.users:
+                core.has_access(user.id)
+            fake = FakeInteraction(self.bot, None, self.users[0], 0)
+            fake.started, fake.first_response, fake.outcome = started, time.perf_counter(), "ok"
+            return fake
+        if scenario == "faq":
+            names = [c.name for c in self.bot.tree.get_commands() if c.extras.get("about") and c.module == "cogs.faq"]
+            interaction = self.interaction(names[n % len(names)], n)
+            await interaction.command.callback(interaction, None)
+        elif scenario == "about":
+            interaction = self.interaction("about", n)
+            await interaction.command.callback(interaction)
+        elif scenario == "gif":
+            interaction = self.interaction("gif", n)
+            await interaction.command.callback(interaction, self.image(n), None)
+        elif scenario == "caption":
+            interaction = self.interaction("caption", n)
+            await interaction.command.callback(interaction, f"when the bench hits run {n}", self.image(n), None)
+        else:
+            interaction = self.interaction("Quote", n)
+            author = FakeUser(USER_BASE + 10_000 + n % 50, name=f"author{n % 50}")
+            author.default_avatar.url = f"{self.stub.url}files/avatar.png"
+            text = f"load test quote {n}" if not self.args.coalesce else "load test quote"
+            await interaction.command.callback(interaction, FakeMessage(author, text))
+        return interaction
+
+    async def run(self, scenario: str):
+        lag = []
+        sampler = asyncio.create_task(sample_lag(lag))
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        results = []
+
+        async def one(n: int):
+            async with semaphore:
+                try:
+                    interaction = await self.call(scenario, n)
+                except Exception as e:
+                    print(f"{scenario} #{n} raised {e!r}")
+                    return
+                results.append((interaction, time.perf_counter()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in range(self.args.requests)))
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+
+        totals = [(end - i.started) * 1000 for i, end in results]
+        firsts = [(i.first_response - i.started) * 1000 for i, _ in results if i.first_response]
+        outcomes = Counter(i.outcome or "no response" for i, _ in results)
+        import core
+        own, children = peak_rss_mb(core.image_worker)
+        print(
+            f"{scenario:>8}: {len(results) / elapsed:7.1f} req/s  "
+            f"p50={pct(totals, 0.5):.0f}ms p99={pct(totals, 0.99):.0f}ms  "
+            f"first p50={pct(firsts, 0.5):.0f}ms p99={pct(firsts, 0.99):.0f}ms  "
+            f"lag p99={pct(lag, 0.99) * 1000:.1f}ms max={max(lag, default=0) * 1000:.1f}ms  "
+            f"rss={own:.0f}MB worker={children:.0f}MB"
+        )
+        print(f"{'':>10}{dict(outcomes)}")
+
+
+async def main_async(args):
+    corpus = build_corpus()
+    stub = await start_stub(files=corpus)
+    install_config(args, stub.url, tempfile.mkdtemp(prefix="bench-quotes-"))
+
+    import core
+    db = mongomock.MongoClient()["mybot"]
+    core.access.collection = db["user_access"]
+    await core.access.migrate(db)
+    await core.access.grant_many(USER_BASE + i for i in range(args.users))
+    await core.access.refresh()
+
+    core.image_worker.start()
+    core.bot.session = core.create_http_session()
+    for name in ("cogs.info", "cogs.faq", "cogs.imaging"):
+        await core.bot.load_extension(name)
+
+    harness = Harness(args, core.bot, stub, corpus)
+    try:
+        for scenario in args.scenarios:
+            await harness.run(scenario)
+    finally:
+        await core.bot.session.close()
+        core.image_worker.close()
+        core.access.close()
+        await stub.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        type=lambda s: [x for x in s.split(",") if x], help=f"comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--users", type=int, default=50, help="distinct users with access")
+    parser.add_argument("--workers", type=int, default=None, help="image worker processes")
+    parser.add_argument("--heavy-concurrency", type=int, default=4, help="job slots for image commands")
+    parser.add_argument("--quote-backend", choices=("api", "local"), default="api")
+    parser.add_argument("--discord-latency", type=float, default=0.0, help="ms added to each fake Discord call")
+    parser.add_argument("--coalesce", action="store_true", help="reuse inputs so identical requests can share work")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the configured per-user rate limits")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare end-to-end latency of the "api" and "local" quote backends.
+
+Run from the repo root:
+
+    python -m bench.quote_backends --runs 20
+
+Every run uses fresh quote text, so neither the bot's result cache nor the
+upstream service can answer from cache. The local backend's avatar cache
+stays warm after the first run, the same as in the bot.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+import quotes
+from images import ImageWorker
+from result_cache import ResultCache
+
+DEFAULT_AVATAR = "https://cdn.discordapp.com/embed/avatars/0.png"
+SAMPLE_TEXT = "Have you tried running Nighty as admin after closing it from task manager? (run {n})"
+
+
+def summarize(name: str, timings: list, errors: int):
+    if not timings:
+        print(f"{name:>6}: all {errors} runs failed")
+        return
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(
+        f"{name:>6}: n={len(timings)} errors={errors} "
+        f"mean={statistics.mean(timings):.0f}ms p50={statistics.median(timings):.0f}ms "
+        f"p95={p95:.0f}ms min={timings[0]:.0f}ms max={timings[-1]:.0f}ms"
+    )
+
+
+async def bench_backend(name: str, render, runs: int, avatar: str):
+    timings, errors = [], 0
+    for n in range(runs):
+        quote_data = {
+            "username": "benchmark",
+            "display_name": "Benchmark",
+            "text": SAMPLE_TEXT.format(n=n),
+            "avatar": avatar,
+            "color": True,
+        }
+        start = time.perf_counter()
+        try:
+            await render(quote_data)
+        except Exception as e:
+            errors += 1
+            print(f"{name} run {n} failed: {e}")
+            continue
+        timings.append((time.perf_counter() - start) * 1000)
+    summarize(name, timings, errors)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--avatar", default=DEFAULT_AVATAR)
+    parser.add_argument("--api-url", default=quotes.DEFAULT_API_URL)
+    parser.add_argument("--font", default=None, help="TTF used by the local renderer")
+    parser.add_argument("--backends", nargs="+", choices=quotes.BACKENDS, default=list(quotes.BACKENDS))
+    args = parser.parse_args()
+
+    worker = ImageWorker(workers=2)
+    worker.start()
+    avatar_cache = ResultCache(max_bytes=8 * 1024 * 1024)
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            renders = {
+                "api": lambda data: quotes.render_api(session, worker, data, args.api_url),
+                "local": lambda data: quotes.render_local(session, worker, data, avatar_cache, args.font),
+            }
+            for name in args.backends:
+                await bench_backend(name, renders[name], args.runs, args.avatar)
+    finally:
+        worker.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
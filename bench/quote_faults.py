@@ -0,0 +1,90 @@
+"""Run the "api" quote backend against a faulty local upstream.
+
+Run from the repo root:
+
+    python -m bench.quote_faults
+
+Walks through a few scenarios against bench.upstream_stub and prints how each
+quote ended, how long it took and what state the circuit breaker was left in:
+a healthy service, slow PNG downloads (hedging), a hung service (deadlines,
+then the breaker opening) and recovery (the half-open probe).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import aiohttp
+
+import quotes
+from bench.upstream_stub import start_stub
+from images import ImageWorker
+from resilience import CircuitBreaker, CircuitOpen
+
+
+async def quote_once(session, worker, stub, breaker, args, n: int):
+    data = {"username": "bench", "display_name": "Bench", "text": f"fault run {n}", "avatar": "", "color": True}
+    start = time.perf_counter()
+    try:
+        await quotes.render_api(
+            session, worker, data, stub.url,
+            breaker=breaker,
+            timeout=args.timeout,
+            png_timeout=args.timeout,
+            hedge_delay=args.hedge_delay,
+        )
+        outcome = "ok"
+    except CircuitOpen:
+        outcome = "circuit open"
+    except quotes.QuoteError as e:
+        outcome = str(e).lstrip("> ")
+    return outcome, (time.perf_counter() - start) * 1000
+
+
+async def scenario(name: str, session, worker, stub, breaker, args, runs: int):
+    results = [await quote_once(session, worker, stub, breaker, args, n) for n in range(runs)]
+    timings = sorted(ms for _, ms in results)
+    outcomes = Counter(outcome for outcome, _ in results)
+    print(
+        f"{name:>10}: {dict(outcomes)} "
+        f"p50={statistics.median(timings):.0f}ms max={timings[-1]:.0f}ms breaker={breaker.state}"
+    )
+
+
+async def run(args):
+    stub = await start_stub()
+    worker = ImageWorker(workers=1)
+    worker.start()
+    breaker = CircuitBreaker(failure_threshold=args.failures, reset_timeout=args.reset)
+    try:
+        async with aiohttp.ClientSession() as session:
+            await scenario("healthy", session, worker, stub, breaker, args, args.runs)
+
+            stub.faults.png_latency, stub.faults.png_slow_rate = args.timeout * 0.8, 0.5
+            await scenario("slow png", session, worker, stub, breaker, args, args.runs)
+            stub.faults.png_latency = 0.0
+
+            stub.faults.hang = True
+            await scenario("outage", session, worker, stub, breaker, args, args.runs)
+
+            stub.faults.hang = False
+            await asyncio.sleep(args.reset)
+            await scenario("recovered", session, worker, stub, breaker, args, args.runs)
+    finally:
+        worker.close()
+        await stub.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-request deadline in seconds")
+    parser.add_argument("--hedge-delay", type=float, default=0.2)
+    parser.add_argument("--failures", type=int, default=3, help="breaker failure threshold")
+    parser.add_argument("--reset", type=float, default=2.0, help="breaker reset timeout in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
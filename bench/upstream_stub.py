@@ -0,0 +1,121 @@
+"""Local stand-in for the fakequote API with injectable latency and errors.
+
+Run on its own and point QUOTE_API_URL at it:
+
+    python -m bench.upstream_stub --port 8765 --latency 0.2 --error-rate 0.1
+
+or start it in-process with start_stub() and change `stub.faults` between
+requests. POST / answers like the real service with a link to /quote.png,
+which serves a static PNG. Anything passed as `files` is served from
+/files/<name>, for image downloads and avatars.
+"""
+import argparse
+import asyncio
+import io
+import random
+
+from aiohttp import web
+from PIL import Image
+
+
+class Faults:
+    def __init__(self, latency: float = 0.0, png_latency: float = 0.0, png_slow_rate: float = 1.0,
+                 error_rate: float = 0.0, hang: bool = False):
+        self.latency = latency              # seconds before POST answers
+        self.png_latency = png_latency      # seconds before a slow PNG answers
+        self.png_slow_rate = png_slow_rate  # share of PNG downloads that are slow
+        self.error_rate = error_rate        # share of POSTs that get a 500
+        self.hang = hang                    # POSTs never answer at all
+
+
+def _sample_png() -> bytes:
+    buf = io.BytesIO()
+    Image.linear_gradient("L").resize((1024, 512)).convert("RGB").save(buf, "PNG")
+    return buf.getvalue()
+
+
+def make_app(faults: Faults, files: dict = None) -> web.Application:
+    png = _sample_png()
+    files = files or {}  # name -> (bytes, content type)
+    app = web.Application()
+    app["requests"] = 0
+    app["release"] = asyncio.Event()  # set on close so hung requests can finish
+
+    async def quote(request):
+        app["requests"] += 1
+        if faults.hang:
+            await app["release"].wait()
+            return web.Response(status=503)
+        await asyncio.sleep(faults.latency)
+        if random.random() < faults.error_rate:
+            return web.Response(status=500, text="upstream error")
+        await request.read()
+        return web.json_response({"success": True, "url": f"{request.url.origin()}/quote.png"})
+
+    async def image(request):
+        if random.random() < faults.png_slow_rate:
+            await asyncio.sleep(faults.png_latency)
+        return web.Response(body=png, content_type="image/png")
+
+    async def file(request):
+        entry = files.get(request.match_info["name"])
+        if entry is None:
+            return web.Response(status=404)
+        body, content_type = entry
+        return web.Response(body=body, content_type=content_type)
+
+    app.router.add_post("/", quote)
+    app.router.add_get("/quote.png", image)
+    app.router.add_get("/files/{name}", file)
+    return app
+
+
+class Stub:
+    def __init__(self, runner: web.AppRunner, app: web.Application, faults: Faults, url: str):
+        self.runner = runner
+        self.app = app
+        self.faults = faults
+        self.url = url
+
+    @property
+    def requests(self) -> int:
+        return self.app["requests"]
+
+    async def close(self):
+        self.app["release"].set()
+        await self.runner.cleanup()
+
+
+async def start_stub(faults: Faults = None, host: str = "127.0.0.1", port: int = 0, files: dict = None) -> Stub:
+    faults = faults or Faults()
+    app = make_app(faults, files)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return Stub(runner, app, faults, f"http://{host}:{port}/")
+
+
+async def serve(args):
+    faults = Faults(args.latency, args.png_latency, args.png_slow_rate, args.error_rate)
+    stub = await start_stub(faults, port=args.port)
+    print(f"fakequote stub listening on {stub.url}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--png-latency", type=float, default=0.0)
+    parser.add_argument("--png-slow-rate", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Owner-only commands: access management, bot settings, stats and memory."""
+import asyncio, gc, tracemalloc
+import discord
+from discord import app_commands
+from discord.ext import commands
+from discord.ui import View, Button
+from core import (
+    GODS, access, avatar_cache, bot, chunk_lines, command_cooldown, image_worker, inflight,
+    job_scheduler, loop_watchdog, memory_guard, memory_tracer, parse_user_ids, quote_cache,
+    rate_limiter, trim_caches,
+)
+import startup
+from memwatch import fmt_bytes, proc_memory, release_memory
+from metrics import metrics
+
+# ------------------ ADMIN COMMANDS (ephemeral) ------------------
+@app_commands.command(name="addaccess", description="Grant someone access to the bot (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(user="The user to grant access")
+@command_cooldown
+async def add_access(interaction: discord.Interaction, user: discord.User):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You arent a admin .. <:smh:1423529032707739688>", ephemeral=True)
+
+    if not await access.grant(user.id):
+        return await interaction.response.send_message(f"> {user.mention} already has access.", ephemeral=True)
+
+    await interaction.response.send_message(f"> {user.mention} has been granted access.", ephemeral=True)
+
+@app_commands.command(name="removeaccess", description="Remove someone's access (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(user="The user to remove access from")
+@command_cooldown
+async def remove_access(interaction: discord.Interaction, user: discord.User):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You arent a admin .. <:smh:1423529032707739688>", ephemeral=True)
+
+    if not await access.revoke(user.id):
+        return await interaction.response.send_message(f"> {user.mention} did not have access.", ephemeral=True)
+
+    await interaction.response.send_message(f"> {user.mention} access removed.", ephemeral=True)
+
+@app_commands.command(name="bulkaddaccess", description="Grant many users access at once (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(users="Mentions or user IDs, separated by spaces")
+@command_cooldown
+async def bulk_add_access(interaction: discord.Interaction, users: str):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You arent a admin .. <:smh:1423529032707739688>", ephemeral=True)
+
+    user_ids = parse_user_ids(users)
+    if not user_ids:
+        return await interaction.response.send_message("> No user mentions or IDs found.", ephemeral=True)
+
+    granted = await access.grant_many(user_ids)
+    await interaction.response.send_message(f"> Granted access to {granted} user(s), {len(set(user_ids)) - granted} already had it.", ephemeral=True)
+
+@app_commands.command(name="bulkremoveaccess", description="Remove many users' access at once (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(users="Mentions or user IDs, separated by spaces")
+@command_cooldown
+async def bulk_remove_access(interaction: discord.Interaction, users: str):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You arent a admin .. <:smh:1423529032707739688>", ephemeral=True)
+
+    user_ids = parse_user_ids(users)
+    if not user_ids:
+        return await interaction.response.send_message("> No user mentions or IDs found.", ephemeral=True)
+
+    removed = await access.revoke_many(user_ids)
+    await interaction.response.send_message(f"> Removed access from {removed} user(s).", ephemeral=True)
+
+
+ACCESS_PAGE_SIZE = 10
+ACCESS_VIEW_TIMEOUT = 180
+
+def access_embed(user_ids: list, page: int, pages: int) -> discord.Embed:
+    embed = discord.Embed(
+        title="Users",
+        color=discord.Color.blurple()
+    )
+    items = [f"> God: <@{god_id}>" for god_id in GODS] if page == 0 else []
+    items += [f"> <@{user_id}>" for user_id in user_ids]
+    for item in items:
+        embed.add_field(name="\u200b", value=item, inline=True)
+    embed.set_footer(text=f"Page {page + 1}/{pages}")
+    return embed
+
+class AccessView(View):
+    # Holds only the ids on screen; each button press fetches the neighbouring
+    # page by key. Stops listening (and greys out) after ACCESS_VIEW_TIMEOUT.
+    def __init__(self, interaction: discord.Interaction, user_ids: list, total: int):
+        super().__init__(timeout=ACCESS_VIEW_TIMEOUT)
+        self.interaction = interaction
+        self.user_ids = user_ids
+        self.page = 0
+        self.pages = max(1, -(-total // ACCESS_PAGE_SIZE))
+        self.update_buttons()
+
+    def embed(self) -> discord.Embed:
+        return access_embed(self.user_ids, self.page, self.pages)
+
+    def update_buttons(self):
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page >= self.pages - 1 or len(self.user_ids) < ACCESS_PAGE_SIZE
+
+    async def interaction_check(self, interaction_btn: discord.Interaction) -> bool:
+        return interaction_btn.user.id == self.interaction.user.id
+
+    async def show(self, interaction_btn: discord.Interaction, user_ids: list, page: int):
+        if user_ids:
+            self.user_ids, self.page = user_ids, page
+        self.update_buttons()
+        await interaction_btn.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="<-", style=discord.ButtonStyle.gray)
+    async def previous(self, interaction_btn: discord.Interaction, button: Button):
+        before = self.user_ids[0] if self.user_ids else None
+        user_ids = await access.page(before=before, limit=ACCESS_PAGE_SIZE) if before is not None else []
+        await self.show(interaction_btn, user_ids, max(0, self.page - 1))
+
+    @discord.ui.button(label="->", style=discord.ButtonStyle.gray)
+    async def next(self, interaction_btn: discord.Interaction, button: Button):
+        user_ids = await access.page(after=self.user_ids[-1], limit=ACCESS_PAGE_SIZE)
+        await self.show(interaction_btn, user_ids, self.page + 1)
+
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        try:
+            await self.interaction.edit_original_response(view=self)
+        except discord.HTTPException:
+            pass
+
+@app_commands.command(name="listaccess", description="all users who have access (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@command_cooldown
+async def list_access(interaction: discord.Interaction):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You aren't an admin.. <:smh:1423529032707739688>", ephemeral=True)
+
+    total = await access.count()
+    if not total and not GODS:
+        return await interaction.response.send_message("> No one has access .. gg ig", ephemeral=True)
+
+    user_ids = await access.page(limit=ACCESS_PAGE_SIZE)
+    view = AccessView(interaction, user_ids, total)
+    await interaction.response.send_message(embed=view.embed(), view=view, ephemeral=True)
+
+
+@app_commands.command(name="setname", description="Change the username (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(username="New username")
+@command_cooldown
+async def set_bot_name(interaction: discord.Interaction, username: str):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You arent a admin .. <:smh:1423529032707739688>", ephemeral=True)
+
+    try:
+        await bot.user.edit(username=username)
+        await interaction.response.send_message(f"> Username updated to **{username}**", ephemeral=True)
+    except Exception as e:
+        await interaction.response.send_message(f"> Failed to update the username: {e}", ephemeral=True)
+
+# ------------------ STATS ------------------
+STATS_MAX_COMMANDS = 15
+
+def fmt_seconds(seconds: float) -> str:
+    if seconds == float("inf"):
+        return ">30s"
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.1f}s"
+
+def stats_embed() -> discord.Embed:
+    embed = discord.Embed(title="Stats", color=discord.Color.blurple())
+
+    rows = []
+    for command in metrics.label_values("calls", "command"):
+        total = metrics.merged("command_seconds", command=command)
+        first = metrics.merged("first_response_seconds", command=command)
+        rows.append((total.quantile(0.99), command, total, first))
+    rows.sort(reverse=True)
+
+    lines = [
+        f"> `/{command}` {metrics.count('calls', command=command)} calls, "
+        f"{metrics.count('errors', command=command)} err, "
+        f"{metrics.count('rejected', command=command)} rej · "
+        f"p50 {fmt_seconds(total.quantile(0.5))} p99 {fmt_seconds(p99)} · "
+        f"first p99 {fmt_seconds(first.quantile(0.99))}"
+        for p99, command, total, first in rows[:STATS_MAX_COMMANDS]
+    ]
+    # 15 lines can run past one field's 1024 characters
+    for i, chunk in enumerate(chunk_lines(lines) or ["> No calls yet."]):
+        embed.add_field(name="Commands (slowest p99 first)" if i == 0 else "\u200b", value=chunk, inline=False)
+
+    stages = []
+    for stage in metrics.label_values("stage_seconds", "stage"):
+        h = metrics.merged("stage_seconds", stage=stage)
+        stages.append(f"> `{stage}` n={h.count} p50 {fmt_seconds(h.quantile(0.5))} p99 {fmt_seconds(h.quantile(0.99))}")
+    for i, chunk in enumerate(chunk_lines(stages) or ["> Nothing recorded yet."]):
+        embed.add_field(name="Stages" if i == 0 else "\u200b", value=chunk, inline=False)
+
+    if loop_watchdog is not None:
+        embed.add_field(
+            name="Event loop lag",
+            value=(
+                f"> p50 {fmt_seconds(loop_watchdog.percentile(0.5))} p99 {fmt_seconds(loop_watchdog.percentile(0.99))} "
+                f"max {fmt_seconds(max(loop_watchdog.samples, default=0.0))} · "
+                f"{loop_watchdog.blocked} stalls over {fmt_seconds(loop_watchdog.threshold)}"
+            ),
+            inline=False,
+        )
+
+    if startup.phases:
+        embed.add_field(name="Startup", value=f"> {startup.summary()}", inline=False)
+
+    embed.set_footer(
+        text=f"Rate limited: {metrics.count('rejected', reason='rate_limit')} · "
+             f"Shed (busy): {metrics.count('rejected', reason='busy')} · "
+             f"Latencies are bucket upper bounds"
+    )
+    return embed
+
+@app_commands.command(name="stats", description="Command latency and error stats (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@command_cooldown
+async def stats_cmd(interaction: discord.Interaction):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You arent a admin .. <:smh:1423529032707739688>", ephemeral=True)
+
+    await interaction.response.send_message(embed=stats_embed(), ephemeral=True)
+
+# ------------------ MEMORY ------------------
+MEMORY_ACTIONS = [
+    app_commands.Choice(name="overview", value="overview"),
+    app_commands.Choice(name="start tracing", value="start"),
+    app_commands.Choice(name="snapshot (diffs against the last one)", value="snapshot"),
+    app_commands.Choice(name="stop tracing", value="stop"),
+    app_commands.Choice(name="trim caches", value="trim"),
+]
+EMBED_DESCRIPTION_LIMIT = 4096
+
+def pending_views(client: discord.Client) -> int:
+    # discord.py keeps every view still listening for presses in the
+    # connection's view store; anything piling up here is a leak.
+    store = client._connection._view_store
+    views = {item.view.id for items in store._views.values() for item in items.values() if item.view}
+    views.update(view.id for view in store._synced_message_views.values())
+    return len(views) + len(store._modals)
+
+def memory_embed() -> discord.Embed:
+    embed = discord.Embed(title="Memory", color=discord.Color.blurple())
+
+    own = proc_memory()
+    workers = [proc_memory(pid) for pid in image_worker.pids()]
+    process = f"> RSS {fmt_bytes(own.get('rss'))}, peak {fmt_bytes(own.get('peak'))}"
+    if workers:
+        process += f"\n> {len(workers)} image workers: {fmt_bytes(sum(w.get('rss', 0) for w in workers))} RSS"
+    if memory_guard is not None:
+        process += f"\n> Soft limit {fmt_bytes(memory_guard.soft_limit)}, trimmed {memory_guard.triggered} times"
+    embed.add_field(name="Process", value=process, inline=False)
+
+    caches = [
+        f"> Quote cache: {len(quote_cache)} entries, {fmt_bytes(quote_cache.size)} / {fmt_bytes(quote_cache.max_bytes)}",
+        f"> Avatar cache: {len(avatar_cache)} entries, {fmt_bytes(avatar_cache.size)} / {fmt_bytes(avatar_cache.max_bytes)}",
+        f"> Rate-limit buckets: {len(rate_limiter)} / {rate_limiter.max_users}",
+        f"> Access cache: {len(access)} ids",
+        f"> Jobs: {len(inflight)} in flight, {job_scheduler.running} running, {job_scheduler.queued} queued",
+        f"> Pending views: {pending_views(bot)}",
+        f"> Discord cache: {len(bot.cached_messages)} messages, {len(bot.users)} users, {len(bot.guilds)} guilds",
+    ]
+    embed.add_field(name="Caches", value="\n".join(caches), inline=False)
+
+    if memory_tracer.tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        tracing = f"> On: {fmt_bytes(current)} traced, peak {fmt_bytes(peak)}"
+    else:
+        tracing = "> Off"
+    embed.add_field(name="tracemalloc", value=tracing, inline=True)
+    embed.add_field(name="GC", value=f"> Generations {gc.get_count()}, {len(gc.garbage)} uncollectable", inline=True)
+    return embed
+
+def snapshot_embed(lines: list) -> discord.Embed:
+    title = "Allocation growth since the last snapshot" if memory_tracer.snapshots > 1 else "Largest allocation sites"
+    body = ""
+    for line in lines:
+        if len(body) + len(line) + 9 > EMBED_DESCRIPTION_LIMIT:
+            break
+        body += line + "\n"
+    return discord.Embed(title=title, description=f"```\n{body or 'Nothing traced yet.'}```", color=discord.Color.blurple())
+
+@app_commands.command(name="memory", description="Memory usage, allocation diffs and cache trimming (OWNER ONLY)", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(action="What to do; shows the overview by default")
+@app_commands.choices(action=MEMORY_ACTIONS)
+@command_cooldown
+async def memory_cmd(interaction: discord.Interaction, action: str = "overview"):
+    if str(interaction.user.id) not in GODS:
+        return await interaction.response.send_message("> You arent a admin .. <:smh:1423529032707739688>", ephemeral=True)
+
+    if action == "start":
+        memory_tracer.start()
+        return await interaction.response.send_message("> Tracing allocations. Take a snapshot now and another later to see what grew.", ephemeral=True)
+    if action == "stop":
+        memory_tracer.stop()
+        return await interaction.response.send_message("> Stopped tracing and dropped the snapshots.", ephemeral=True)
+    if action == "trim":
+        before = proc_memory().get("rss")
+        trim_caches()
+        release_memory()
+        after = proc_memory().get("rss")
+        return await interaction.response.send_message(f"> Trimmed caches: RSS {fmt_bytes(before)} -> {fmt_bytes(after)}.", ephemeral=True)
+    if action == "snapshot":
+        if not memory_tracer.tracing:
+            return await interaction.response.send_message("> Tracing is off, start it first.", ephemeral=True)
+        await interaction.response.defer(ephemeral=True)
+        lines = await asyncio.to_thread(memory_tracer.snapshot)
+        return await interaction.followup.send(embed=snapshot_embed(lines), ephemeral=True)
+
+    await interaction.response.send_message(embed=memory_embed(), ephemeral=True)
+
+COMMANDS = (
+    add_access,
+    remove_access,
+    bulk_add_access,
+    bulk_remove_access,
+    list_access,
+    set_bot_name,
+    stats_cmd,
+    memory_cmd,
+)
+
+async def setup(bot: commands.Bot):
+    for command in COMMANDS:
+        bot.tree.add_command(command)
@@ -0,0 +1,86 @@
+"""FAQ commands, defined in data/faq.json.
+
+Every entry becomes a slash command with an optional `ping`. Embeds are built
+once when this extension loads, plus one copy for each user under "variants"
+whose overrides change the text, so answering is a dict lookup. Edit the file
+and run `/reload module:faq` to apply it; a broken file leaves the old
+commands in place.
+"""
+import json
+from types import MappingProxyType
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+import config
+from core import command_cooldown, embed_color, has_access
+
+FAQ_PATH = getattr(config, "FAQ_PATH", "data/faq.json")
+
+
+class FaqEntry:
+    __slots__ = ("name", "description", "about", "access", "embed", "variants")
+
+    def __init__(self, name: str, description: str, about: str, access: bool, embed: discord.Embed, variants: dict):
+        self.name = name
+        self.description = description
+        self.about = about
+        self.access = access
+        self.embed = embed
+        self.variants = variants  # user id (str) -> embed
+
+
+def build_embed(spec: dict, variables: dict) -> discord.Embed:
+    # Lines are str.format templates over `variables`; literal braces are {{ }}.
+    description = "\n".join(spec["lines"]).format_map(variables)
+    return discord.Embed(title=spec["title"], description=description, color=spec.get("color", embed_color))
+
+
+def load_registry(path: str):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    defaults = data.get("variables", {})
+    registry = {}
+    for name, spec in data["commands"].items():
+        embed = build_embed(spec, defaults)
+        variants = {}
+        for user_id, overrides in data.get("variants", {}).items():
+            variant = build_embed(spec, {**defaults, **overrides})
+            if variant.description != embed.description:
+                variants[user_id] = variant
+        registry[name] = FaqEntry(
+            name=name,
+            description=spec["description"],
+            about=spec.get("about", spec["description"]),
+            access=spec.get("access", True),
+            embed=embed,
+            variants=variants,
+        )
+    return MappingProxyType(registry)
+
+
+registry = load_registry(FAQ_PATH)
+
+# ------------------ FAQ COMMANDS (public) ------------------
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(ping="Optional: Mention someone outside the embed")
+@command_cooldown
+async def faq_command(interaction: discord.Interaction, ping: discord.User = None):
+    entry = registry[interaction.command.name]
+    if entry.access and not has_access(interaction.user.id):
+        return await interaction.response.send_message("> You dont have access gng .. ask the owner.", ephemeral=True)
+
+    embed = entry.variants.get(str(interaction.user.id), entry.embed)
+    content = ping.mention if ping else None
+    await interaction.response.send_message(content=content, embed=embed, ephemeral=False)
+
+
+async def setup(bot: commands.Bot):
+    for entry in registry.values():
+        bot.tree.add_command(app_commands.Command(
+            name=entry.name,
+            description=entry.description,
+            callback=faq_command,
+            extras={"about": entry.about},
+        ))
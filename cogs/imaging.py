@@ -0,0 +1,260 @@
+"""Image commands: the Quote context menu, /gif and /caption."""
+import discord
+from discord import app_commands
+from discord.ext import commands
+import io, time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit, urlunsplit
+import downloads
+import quotes
+import typeset
+from core import (
+    API_URL, BUSY_MESSAGE, FONT_PATH, HEAVY_COST, MAX_DOWNLOAD_BYTES, MAX_IMAGE_PIXELS,
+    MAX_OUTPUT_DIM, QUOTE_API_TIMEOUT, QUOTE_BACKEND, QUOTE_FALLBACK, QUOTE_FONT,
+    QUOTE_HEDGE_DELAY, QUOTE_PNG_TIMEOUT, UPLOAD_LIMIT_BYTES, avatar_cache, bot,
+    command_cooldown, has_access, image_worker, inflight, job_scheduler, quote_breaker,
+    quote_cache,
+)
+from images import CaptionJob, GifJob, InputTooLarge, OutputTooLarge
+from metrics import metrics
+from resilience import CircuitOpen
+from result_cache import payload_key
+from scheduler import QueueFull
+
+# ------------------ IMAGE JOBS ------------------
+# Quote, /gif and /caption run their work through `inflight`, so identical
+# requests arriving together share one download/render and each just sends
+# its own followup. The work itself waits for a slot in `job_scheduler`;
+# requests joining it don't queue at all (see shared_job).
+DISCORD_CDN_HOSTS = ("cdn.discordapp.com", "media.discordapp.net")
+
+class JobFailed(Exception):
+    # The message is sent to the user as-is.
+    def __init__(self, message: str, ephemeral: bool = True):
+        super().__init__(message)
+        self.ephemeral = ephemeral
+
+@asynccontextmanager
+async def admitted(interaction: discord.Interaction):
+    # Holds a job slot for the block. Call after defer(): a queued user sees
+    # their place in line, and that notice is removed once their turn comes.
+    queued = False
+
+    async def show_position(position: int):
+        nonlocal queued
+        queued = True
+        await interaction.edit_original_response(content=f"> Queued — you're #{position} in line.")
+
+    try:
+        started = time.perf_counter()
+        async with job_scheduler.slot(interaction.user.id, show_position):
+            metrics.observe("stage_seconds", time.perf_counter() - started, stage="queue")
+            if queued:
+                await interaction.delete_original_response()
+            yield
+    except QueueFull:
+        raise JobFailed(BUSY_MESSAGE)
+
+async def shared_job(interaction: discord.Interaction, key, factory) -> bytes:
+    # The slot is taken inside the shared task, so a unique job holds exactly
+    # one and identical requests just await it. Queue notices go to whoever
+    # started the job.
+    async def admitted_job():
+        async with admitted(interaction):
+            return await factory()
+
+    return await inflight.do(key, admitted_job)
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    # CDN links carry rotating signature params; the path alone identifies the file
+    query = "" if host in DISCORD_CDN_HOSTS else parts.query
+    return urlunsplit((parts.scheme.lower(), host, parts.path, query, ""))
+
+def attachment_error(image: discord.Attachment):
+    try:
+        downloads.check_attachment(image, MAX_DOWNLOAD_BYTES, MAX_IMAGE_PIXELS)
+    except downloads.DownloadError as e:
+        return str(e)
+    return None
+
+async def fetch_image(image_url: str) -> bytes:
+    try:
+        return await downloads.fetch_image(bot.session, image_url, MAX_DOWNLOAD_BYTES, MAX_IMAGE_PIXELS)
+    except downloads.DownloadError as e:
+        raise JobFailed(str(e))
+
+async def render_quote(quote_data: dict, cache_key: str) -> bytes:
+    try:
+        if QUOTE_BACKEND == "local":
+            gif_data = await quotes.render_local(bot.session, image_worker, quote_data, avatar_cache, typeset.resolve_font(QUOTE_FONT))
+        else:
+            try:
+                gif_data = await quotes.render_api(
+                    bot.session, image_worker, quote_data, API_URL,
+                    breaker=quote_breaker,
+                    timeout=QUOTE_API_TIMEOUT,
+                    png_timeout=QUOTE_PNG_TIMEOUT,
+                    hedge_delay=QUOTE_HEDGE_DELAY,
+                )
+            except CircuitOpen:
+                # the service has been failing; don't make the user wait on it
+                if QUOTE_FALLBACK != "local":
+                    raise JobFailed("> The quote service is down right now, try again in a minute.")
+                gif_data = await quotes.render_local(bot.session, image_worker, quote_data, avatar_cache, typeset.resolve_font(QUOTE_FONT))
+    except quotes.QuoteError as e:
+        if e.fallback_url:
+            raise JobFailed(e.fallback_url, ephemeral=False)
+        raise JobFailed(str(e))
+
+    await quote_cache.put(cache_key, gif_data)
+    return gif_data
+
+async def run_image_job(job) -> bytes:
+    try:
+        return await image_worker.run(job)
+    except InputTooLarge:
+        raise JobFailed("> That animation has too many frames at that size. Try a shorter or smaller one.")
+    except OutputTooLarge:
+        raise JobFailed("> The result is too big to upload. Try a smaller image.")
+
+async def render_gif(image_url: str) -> bytes:
+    data = await fetch_image(image_url)
+    return await run_image_job(GifJob(data, MAX_OUTPUT_DIM, UPLOAD_LIMIT_BYTES))
+
+async def render_caption(image_url: str, text: str) -> bytes:
+    data = await fetch_image(image_url)
+    return await run_image_job(CaptionJob(data, text, MAX_OUTPUT_DIM, UPLOAD_LIMIT_BYTES, typeset.resolve_font(FONT_PATH)))
+
+# ------------------ QUOTE COMMAND ------------------
+
+async def generate_quote(interaction: discord.Interaction, message: discord.Message):
+    if not has_access(interaction.user.id):
+        return await interaction.response.send_message("> You dont have access gng .. ask the owner.", ephemeral=True)
+
+    await interaction.response.defer()
+
+    try:
+        if not message.content:
+            return await interaction.followup.send("> The selected message must contain text.", ephemeral=True)
+
+        author = message.author
+        display_name = author.display_name or author.name
+        username = author.name
+        avatar_url = str(author.avatar.url) if getattr(author, "avatar", None) else str(author.default_avatar.url)
+        message_text = message.content
+
+        quote_data = {
+            "username": username,
+            "display_name": display_name,
+            "text": message_text,
+            "avatar": avatar_url,
+            "color": True,
+        }
+
+        cache_key = payload_key(quote_data)
+        gif_data = await quote_cache.get(cache_key)
+        if gif_data is None:
+            gif_data = await shared_job(interaction, ("quote", cache_key), lambda: render_quote(quote_data, cache_key))
+
+        with metrics.stage("upload"):
+            await interaction.followup.send(file=discord.File(io.BytesIO(gif_data), "quote.gif"))
+
+    except JobFailed as e:
+        await interaction.followup.send(str(e), ephemeral=e.ephemeral)
+    except Exception as e:
+        await interaction.followup.send("> An unexpected error occurred while generating the quote.", ephemeral=True)
+        metrics.inc("errors")
+        print(f"Error in generate_quote: {str(e)}")
+
+@app_commands.context_menu(name="Quote", extras={"about": "Generate a fake quote image (as GIF) from a message"})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@command_cooldown(cost=HEAVY_COST, heavy=True)
+async def quote_context_menu(interaction: discord.Interaction, message: discord.Message):
+    await generate_quote(interaction, message)
+
+
+# ------------------ GIF COMMAND ------------------
+
+@app_commands.command(name="gif", description="Convert an image (PNG/JPG) into a GIF file")
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(image="Upload an image", url="Or provide an image link")
+@command_cooldown(cost=HEAVY_COST, heavy=True)
+async def gif_cmd(interaction: discord.Interaction, image: discord.Attachment = None, url: str = None):
+    if not has_access(interaction.user.id):
+        return await interaction.response.send_message("> You dont have access gng .. ask the owner.", ephemeral=True)
+
+    if not image and not url:
+        return await interaction.response.send_message("> You must upload an image or provide a link.", ephemeral=True)
+
+    if image and not url:
+        error = attachment_error(image)
+        if error:
+            return await interaction.response.send_message(error, ephemeral=True)
+
+    await interaction.response.defer()
+
+    try:
+        image_url = url or image.url
+
+        gif_data = await shared_job(interaction, ("gif", normalize_url(image_url)), lambda: render_gif(image_url))
+        with metrics.stage("upload"):
+            await interaction.followup.send(file=discord.File(io.BytesIO(gif_data), "converted.gif"))
+
+    except JobFailed as e:
+        await interaction.followup.send(str(e), ephemeral=e.ephemeral)
+    except Exception as e:
+        await interaction.followup.send("> An unexpected error occurred while converting the image.", ephemeral=True)
+        metrics.inc("errors")
+        print(f"Error in /gif: {str(e)}")
+
+@app_commands.command(
+    name="caption",
+    description="Add a caption at the top of an image and convert it to GIF"
+)
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(
+    image="Upload an image",
+    url="Or provide an image link",
+    text="Text to add as a caption"
+)
+@command_cooldown(cost=HEAVY_COST, heavy=True)
+async def caption_cmd(interaction: discord.Interaction, text: str, image: discord.Attachment = None, url: str = None):
+    if not has_access(interaction.user.id):
+        return await interaction.response.send_message("> You don't have access. Ask the owner.", ephemeral=True)
+
+    if not image and not url:
+        return await interaction.response.send_message("> You must upload an image or provide a link.", ephemeral=True)
+
+    if image and not url:
+        error = attachment_error(image)
+        if error:
+            return await interaction.response.send_message(error, ephemeral=True)
+
+    await interaction.response.defer()
+
+    try:
+        image_url = url or image.url
+
+        key = ("caption", normalize_url(image_url), text)
+        gif_data = await shared_job(interaction, key, lambda: render_caption(image_url, text))
+        with metrics.stage("upload"):
+            await interaction.followup.send(file=discord.File(io.BytesIO(gif_data), "captioned.gif"))
+
+    except JobFailed as e:
+        await interaction.followup.send(str(e), ephemeral=e.ephemeral)
+    except Exception as e:
+        await interaction.followup.send("> An error occurred while adding the caption.", ephemeral=True)
+        metrics.inc("errors")
+        print(f"Error in /caption: {e}")
+
+COMMANDS = (
+    quote_context_menu,
+    gif_cmd,
+    caption_cmd,
+)
+
+async def setup(bot: commands.Bot):
+    for command in COMMANDS:
+        bot.tree.add_command(command)
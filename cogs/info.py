@@ -0,0 +1,96 @@
+"""Public info commands. The FAQ answers themselves live in cogs.faq."""
+import discord
+from discord import app_commands
+from discord.ext import commands
+from datetime import datetime, timezone
+from core import LIGHT_COST, bot_start_time, chunk_lines, command_cooldown, embed_color, has_access
+
+# ------------------ HELP / INFO COMMANDS (public) ------------------
+def command_lines(tree: app_commands.CommandTree) -> list:
+    # One line per public command, in registration order. Commands marked
+    # extras={"hidden": True} (the owner ones) are left out; extras["about"]
+    # overrides the slash command description.
+    lines = []
+    for command in tree.get_commands():
+        description = getattr(command, "description", "")
+        if command.extras.get("hidden"):
+            continue
+        about = command.extras.get("about", description)
+        if isinstance(command, app_commands.ContextMenu):
+            lines.append(f"> **Context Menu → `{command.name}`** — {about}")
+        else:
+            lines.append(f"> `/{command.name}` — {about}")
+    return lines
+
+@app_commands.command(
+    name="about",
+    description="Show about the bot",
+    extras={"about": "Show information about the bot"},
+)
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@command_cooldown(cost=LIGHT_COST)
+async def help_cmd(interaction: discord.Interaction):
+    now = datetime.now(timezone.utc)
+    uptime_seconds = int((now - bot_start_time).total_seconds())
+    hours, remainder = divmod(uptime_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    uptime_str = f"{hours}h {minutes}m {seconds}s"
+
+    embed = discord.Embed(
+        title="About",
+        description="",
+        color=embed_color
+    )
+
+    embed.add_field(
+        name="Stats",
+        value=(
+            f"> Uptime: ``{uptime_str}``"
+        ),
+        inline=True
+    )
+
+    for i, chunk in enumerate(chunk_lines(command_lines(interaction.client.tree))):
+        embed.add_field(name="Commands" if i == 0 else "\u200b", value=chunk, inline=True)
+
+    embed.add_field(
+        name="Owners",
+        value="> <@1361736124858630274>\n> <@277851641976324096>\n> <@1093694817285971988>",
+        inline=False
+    )
+
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@app_commands.command(name="authbot", description="Get the bot authorization link")
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@command_cooldown
+async def auth_bot(interaction: discord.Interaction):
+    if not has_access(interaction.user.id):
+        return await interaction.response.send_message("> You dont have access gng .. ask the owner.", ephemeral=True)
+
+    message = "https://discord.com/oauth2/authorize?client_id=1423488983148531763"
+
+    await interaction.response.send_message(message, ephemeral=False)
+
+@app_commands.command(name="nightyauth", description="Power nighty auth")
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@command_cooldown
+async def nighty_auth(interaction: discord.Interaction):
+    await interaction.response.send_message("https://i.imgur.com/5Kupoxu.gif")
+
+@app_commands.command(name="dexter", description="I knew you where a fucking creep", extras={"hidden": True})
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@command_cooldown
+async def dexter(interaction: discord.Interaction):
+    await interaction.response.send_message("https://files.catbox.moe/vanxj7.mp4")
+
+COMMANDS = (
+    help_cmd,
+    auth_bot,
+    nighty_auth,
+    dexter,
+)
+
+async def setup(bot: commands.Bot):
+    for command in COMMANDS:
+        bot.tree.add_command(command)
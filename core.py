@@ -0,0 +1,339 @@
+"""Shared state for the bot and its extensions.
+
+Everything that should survive a /reload lives here: the bot object, the
+Mongo-backed access store, caches, the worker pool, rate limiting and the job
+queue. Command modules under cogs/ import from this module and can be
+reloaded without touching any of it.
+"""
+import discord
+from discord.ext import commands, tasks
+from datetime import datetime, timezone
+import aiohttp, asyncio, importlib, math, os, re, time
+from functools import wraps
+import config
+from access_store import AccessStore, NotConnected
+import quotes
+import typeset
+from images import ImageWorker
+from loopwatch import LoopWatchdog
+from memwatch import MemoryGuard, Tracer
+from metrics import current_command, metrics
+from result_cache import ResultCache
+from ratelimit import RateLimiter
+from resilience import CircuitBreaker
+from scheduler import FairScheduler
+from shared_state import SharedRateLimiter, SharedState
+from singleflight import SingleFlight
+
+# ------------------ SHARDING ------------------
+# launcher.py starts several copies of main.py and tells each one which shards
+# it runs through the environment. Started directly, main.py is the only
+# process and runs every shard (SHARD_COUNT, or as many as Discord suggests).
+SHARD_COUNT = int(os.environ.get("BOT_SHARD_COUNT", 0)) or getattr(config, "SHARD_COUNT", None)
+SHARD_IDS = [int(i) for i in os.environ["BOT_SHARD_IDS"].split(",")] if os.environ.get("BOT_SHARD_IDS") else None
+PROCESS_INDEX = int(os.environ.get("BOT_PROCESS_INDEX", 0))
+PROCESS_COUNT = int(os.environ.get("BOT_PROCESS_COUNT", 1))
+# Runs the migrations and syncs the command tree on behalf of all of them.
+PRIMARY_PROCESS = PROCESS_INDEX == 0
+# Rate-limit buckets and change notifications shared between the processes.
+SHARED_STATE_PATH = os.environ.get("BOT_SHARED_STATE") or getattr(config, "SHARED_STATE_PATH", None)
+SHARED_STATE_POLL_SECONDS = getattr(config, "SHARED_STATE_POLL_SECONDS", 5)
+shared_state = SharedState(SHARED_STATE_PATH) if SHARED_STATE_PATH else None
+
+# ------------------ CONFIG ------------------
+# Connected by app's startup task while the gateway login is in flight.
+access = AccessStore(workers=getattr(config, "ACCESS_STORE_WORKERS", 4))
+if shared_state is not None:
+    access.on_change = lambda: shared_state.bump("access")
+MONGO_DATABASE = "mybot"
+MONGO_OPTIONS = {
+    "pool_size": getattr(config, "MONGO_POOL_SIZE", 10),
+    "timeout_ms": getattr(config, "MONGO_TIMEOUT_MS", 5000),
+}
+image_worker = ImageWorker(
+    # the cores are split between the processes on this machine
+    workers=getattr(config, "IMAGE_WORKERS", None) or max(1, (os.cpu_count() or 1) // PROCESS_COUNT),
+    timeout=getattr(config, "IMAGE_JOB_TIMEOUT", 15.0),
+    cpu_seconds=getattr(config, "IMAGE_JOB_CPU_SECONDS", 10),
+)
+quote_cache = ResultCache(
+    max_bytes=getattr(config, "QUOTE_CACHE_BYTES", 32 * 1024 * 1024),
+    directory=getattr(config, "QUOTE_CACHE_DIR", "cache/quotes"),
+    disk_max_bytes=getattr(config, "QUOTE_CACHE_DISK_BYTES", 256 * 1024 * 1024),
+)
+avatar_cache = ResultCache(max_bytes=getattr(config, "AVATAR_CACHE_BYTES", 8 * 1024 * 1024))
+
+TOKEN = config.TOKEN
+GODS = config.GODS
+BOT_NAME_PM2 = config.BOT_NAME_PM2
+BOT_PM2_ID = config.BOT_PM2_ID
+API_URL = getattr(config, "QUOTE_API_URL", quotes.DEFAULT_API_URL)
+QUOTE_BACKEND = getattr(config, "QUOTE_BACKEND", "api")  # "api" or "local"
+# As configured; typeset.resolve_font (cached) turns these into loadable paths
+# on first use, and each worker caches the loaded font.
+FONT_PATH = getattr(config, "FONT_PATH", None)
+QUOTE_FONT = getattr(config, "QUOTE_FONT", FONT_PATH)
+if QUOTE_BACKEND not in quotes.BACKENDS:
+    raise ValueError(f"QUOTE_BACKEND must be one of {quotes.BACKENDS}, got {QUOTE_BACKEND!r}")
+# Upstream quote API: per-request deadlines, a hedged PNG download, and a
+# breaker that sends quotes to QUOTE_FALLBACK ("local" or "error") while open.
+QUOTE_API_TIMEOUT = getattr(config, "QUOTE_API_TIMEOUT", 8.0)
+QUOTE_PNG_TIMEOUT = getattr(config, "QUOTE_PNG_TIMEOUT", 5.0)
+QUOTE_HEDGE_DELAY = getattr(config, "QUOTE_HEDGE_DELAY", 1.5)  # None disables
+QUOTE_FALLBACK = getattr(config, "QUOTE_FALLBACK", "local")
+quote_breaker = CircuitBreaker(
+    failure_threshold=getattr(config, "QUOTE_BREAKER_FAILURES", 5),
+    reset_timeout=getattr(config, "QUOTE_BREAKER_RESET", 30.0),
+)
+
+def warm_imaging():
+    # Pillow and the fonts load on first use. app runs this in a thread after
+    # login so the first image command doesn't pay for them on the loop.
+    importlib.import_module("PIL.Image")
+    typeset.resolve_font(FONT_PATH)
+    typeset.resolve_font(QUOTE_FONT)
+
+embed_color = int("3480be", 16)
+# Embed field values are capped by Discord.
+FIELD_LIMIT = 1024
+
+def chunk_lines(lines: list, limit: int = FIELD_LIMIT) -> list:
+    # Joins lines into as few field values as fit under the limit.
+    chunks, current = [], ""
+    for line in lines:
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+bot_start_time = datetime.now(timezone.utc)
+
+MAX_DOWNLOAD_BYTES = getattr(config, "MAX_DOWNLOAD_BYTES", 16 * 1024 * 1024)
+MAX_IMAGE_PIXELS = getattr(config, "MAX_IMAGE_PIXELS", 50_000_000)
+MAX_OUTPUT_DIM = getattr(config, "MAX_OUTPUT_DIM", 720)
+UPLOAD_LIMIT_BYTES = getattr(config, "UPLOAD_LIMIT_BYTES", 10 * 1024 * 1024 - 256 * 1024)
+
+HTTP_TIMEOUT = getattr(config, "HTTP_TIMEOUT", 20)
+HTTP_CONNECT_TIMEOUT = getattr(config, "HTTP_CONNECT_TIMEOUT", 5)
+HTTP_READ_TIMEOUT = getattr(config, "HTTP_READ_TIMEOUT", 10)
+HTTP_LIMIT_PER_HOST = getattr(config, "HTTP_LIMIT_PER_HOST", 8)
+
+def create_http_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_LIMIT_PER_HOST * 4,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=HTTP_TIMEOUT,
+        sock_connect=HTTP_CONNECT_TIMEOUT,
+        sock_read=HTTP_READ_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[http_trace()])
+
+def http_trace() -> aiohttp.TraceConfig:
+    # Files every outbound request under the "http" stage of the running command.
+    async def on_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_end(session, ctx, params):
+        metrics.observe("stage_seconds", time.perf_counter() - ctx.start, stage="http")
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    trace.on_request_exception.append(on_end)
+    return trace
+
+class SupportBot(commands.AutoShardedBot):
+    # One pooled session for every outbound request, opened in setup_hook.
+    session: aiohttp.ClientSession = None
+    # Prometheus endpoint, only when METRICS_PORT is set.
+    metrics_runner = None
+    # app.finish_startup, running alongside the gateway login.
+    startup_task: asyncio.Task = None
+
+    async def close(self):
+        if self.startup_task is not None and self.startup_task is not asyncio.current_task():
+            self.startup_task.cancel()
+        await super().close()
+        if self.session is not None:
+            await self.session.close()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        if loop_watchdog is not None:
+            loop_watchdog.stop()
+        access.close()
+        image_worker.close()
+        if shared_state is not None:
+            shared_state.close()
+
+# Opt-in: set LOOP_WATCHDOG_MS to log a stack whenever the loop stalls that long.
+LOOP_WATCHDOG_MS = getattr(config, "LOOP_WATCHDOG_MS", None)
+loop_watchdog = LoopWatchdog(threshold=LOOP_WATCHDOG_MS / 1000) if LOOP_WATCHDOG_MS else None
+
+intents = discord.Intents.default()
+intents.message_content = True
+bot = SupportBot(command_prefix="!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+
+# ------------------ COOLDOWN SETUP ------------------
+# Each user has a token bucket; commands spend `cost` tokens from it. Heavy
+# (image) commands are refused up front when the job queue is already full.
+RATE_LIMIT_OPTIONS = {
+    "rate": getattr(config, "RATE_LIMIT_RATE", 0.5),
+    "burst": getattr(config, "RATE_LIMIT_BURST", 3.0),
+    "max_users": getattr(config, "RATE_LIMIT_MAX_USERS", 10_000),
+}
+# one budget per user across every process when they share state
+rate_limiter = SharedRateLimiter(shared_state, **RATE_LIMIT_OPTIONS) if shared_state else RateLimiter(**RATE_LIMIT_OPTIONS)
+HEAVY_COST = 2.0
+LIGHT_COST = 0.5
+job_scheduler = FairScheduler(
+    concurrency=getattr(config, "HEAVY_CONCURRENCY", 4),
+    max_queue=getattr(config, "JOB_QUEUE_SIZE", 32),
+)
+BUSY_MESSAGE = "> The bot is busy right now, try again in a few seconds."
+# Right after a restart the access cache is still loading next to the gateway
+# login; commands wait this long for it, then gated ones get STARTING_MESSAGE
+# (has_access raises NotConnected) instead of being refused.
+ACCESS_LOAD_WAIT = 2.0
+STARTING_MESSAGE = "> The bot is still starting up, try again in a few seconds."
+
+class TimedResponse(discord.InteractionResponse):
+    # Records how long the command took to send its first response or defer.
+    __slots__ = ("_started", "_recorded")
+
+    def __init__(self, parent: discord.Interaction, started: float):
+        super().__init__(parent)
+        self._started = started
+        self._recorded = False
+
+    def _record(self):
+        if not self._recorded:
+            self._recorded = True
+            metrics.observe("first_response_seconds", time.perf_counter() - self._started)
+
+    async def defer(self, *args, **kwargs):
+        result = await super().defer(*args, **kwargs)
+        self._record()
+        return result
+
+    async def send_message(self, *args, **kwargs):
+        result = await super().send_message(*args, **kwargs)
+        self._record()
+        return result
+
+    async def edit_message(self, *args, **kwargs):
+        result = await super().edit_message(*args, **kwargs)
+        self._record()
+        return result
+
+    async def send_modal(self, *args, **kwargs):
+        result = await super().send_modal(*args, **kwargs)
+        self._record()
+        return result
+
+def command_cooldown(func=None, *, cost: float = 1.0, heavy: bool = False):
+    # Also the metrics hook: every command call is counted and timed here.
+    if func is None:
+        return lambda f: command_cooldown(f, cost=cost, heavy=heavy)
+
+    @wraps(func)
+    async def wrapper(interaction: discord.Interaction, *args, **kwargs):
+        command = interaction.command.qualified_name if interaction.command else func.__name__
+        token = current_command.set(command)
+        started = time.perf_counter()
+        # Interaction.response is a cached slot; filling it first swaps in the timed one.
+        if not hasattr(interaction, "_cs_response"):
+            interaction._cs_response = TimedResponse(interaction, started)
+        metrics.inc("calls")
+        try:
+            if not access.loaded.is_set():
+                with metrics.stage("access_wait"):
+                    try:
+                        await asyncio.wait_for(access.loaded.wait(), ACCESS_LOAD_WAIT)
+                    except asyncio.TimeoutError:
+                        pass
+            # Shed before charging: a "busy" reply shouldn't cost tokens.
+            if heavy and job_scheduler.full():
+                metrics.inc("rejected", reason="busy")
+                return await interaction.response.send_message(BUSY_MESSAGE, ephemeral=True)
+            user_id = str(interaction.user.id)
+            if user_id not in GODS:
+                retry_after = rate_limiter.acquire(user_id, cost)
+                if retry_after:
+                    metrics.inc("rejected", reason="rate_limit")
+                    return await interaction.response.send_message(f"> You're using commands too fast — wait {math.ceil(retry_after)} seconds.", ephemeral=True)
+            return await func(interaction, *args, **kwargs)
+        except NotConnected:
+            # Mongo is still connecting or the cache loading; not an error
+            metrics.inc("rejected", reason="starting")
+            if interaction.response.is_done():
+                return await interaction.followup.send(STARTING_MESSAGE, ephemeral=True)
+            return await interaction.response.send_message(STARTING_MESSAGE, ephemeral=True)
+        except Exception:
+            metrics.inc("errors")
+            raise
+        finally:
+            metrics.observe("command_seconds", time.perf_counter() - started)
+            current_command.reset(token)
+    return wrapper
+
+@tasks.loop(seconds=60)
+async def sweep_rate_limits():
+    rate_limiter.sweep()
+
+# ------------------ MEMORY ------------------
+# /memory diffs tracemalloc snapshots through memory_tracer. Setting
+# MEMORY_SOFT_LIMIT_MB also trims the caches whenever RSS goes over it.
+memory_tracer = Tracer(frames=getattr(config, "MEMORY_TRACE_FRAMES", 1))
+MEMORY_SOFT_LIMIT_MB = getattr(config, "MEMORY_SOFT_LIMIT_MB", None)
+
+def trim_caches():
+    # Quotes are also on disk and avatars are a refetch away.
+    quote_cache.trim(quote_cache.max_bytes // 2)
+    avatar_cache.trim(0)
+    rate_limiter.sweep()
+
+memory_guard = MemoryGuard(MEMORY_SOFT_LIMIT_MB * 1024 * 1024, trim_caches) if MEMORY_SOFT_LIMIT_MB else None
+
+@tasks.loop(seconds=60)
+async def check_memory():
+    trimmed = memory_guard.check()
+    if trimmed:
+        before, after = trimmed
+        print(f"RSS {before // 2**20}MiB over the {MEMORY_SOFT_LIMIT_MB}MiB soft limit, trimmed caches: now {(after or 0) // 2**20}MiB")
+
+# ------------------ ACCESS CHECK ------------------
+# `access` keeps an in-memory mirror of user_access. Grants/revokes write
+# through to it, and the reconcile loop picks up edits made directly in Mongo.
+ACCESS_RECONCILE_SECONDS = getattr(config, "ACCESS_RECONCILE_SECONDS", 300)
+USER_ID_RE = re.compile(r"\d{15,21}")
+
+def has_access(user_id: int) -> bool:
+    if str(user_id) in GODS:
+        return True
+    if not access.loaded.is_set():
+        # an empty cache can't say no; command_cooldown answers "still starting"
+        raise NotConnected("the access cache hasn't loaded yet")
+    return user_id in access
+
+def parse_user_ids(text: str) -> list:
+    return USER_ID_RE.findall(text)
+
+@tasks.loop(seconds=ACCESS_RECONCILE_SECONDS)
+async def reconcile_access_cache():
+    # the startup task already did the initial load
+    if reconcile_access_cache.current_loop == 0:
+        return
+    try:
+        await access.refresh()
+    except Exception as e:
+        print(f"Access cache reconcile failed: {e}")
+
+# Identical image requests arriving together share one render; see cogs.imaging.
+inflight = SingleFlight()
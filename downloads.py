@@ -0,0 +1,110 @@
+"""Bounded image downloads for user-supplied links and attachments.
+
+The body is streamed in chunks and abandoned as soon as it goes over the byte
+limit. Content-Type and Content-Length are checked before reading anything,
+and the format and pixel dimensions are sniffed from the first chunks, so an
+oversized file or a decompression bomb is rejected before it is buffered.
+"""
+import io
+
+CHUNK_SIZE = 64 * 1024
+# Stop re-parsing the header on every chunk past this point; whatever is
+# still unknown gets checked once on the complete buffer.
+SNIFF_LIMIT = 512 * 1024
+
+# Magic bytes -> format name. WEBP is RIFF????WEBP, checked separately.
+SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "PNG",
+    b"\xff\xd8\xff": "JPEG",
+    b"GIF87a": "GIF",
+    b"GIF89a": "GIF",
+    b"BM": "BMP",
+}
+CONTENT_TYPES = {"image/png", "image/jpeg", "image/jpg", "image/gif", "image/webp", "image/bmp"}
+# Some hosts don't label images properly; the magic-byte sniff still applies.
+UNTYPED = {"", "application/octet-stream", "binary/octet-stream"}
+
+
+class DownloadError(Exception):
+    # The message is sent to the user as-is.
+    pass
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.0f} MB"
+
+
+def sniff_format(head: bytes):
+    for magic, fmt in SIGNATURES.items():
+        if head.startswith(magic):
+            return fmt
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def check_size(width: int, height: int, max_pixels: int):
+    if width * height > max_pixels:
+        raise DownloadError(f"> That image is too large ({width}x{height}). Max is {max_pixels // 1_000_000} megapixels.")
+
+
+def check_attachment(attachment, max_bytes: int, max_pixels: int):
+    # Discord already tells us size, type and dimensions, so bad uploads
+    # can be refused without downloading anything.
+    if attachment.size > max_bytes:
+        raise DownloadError(f"> That image is too big. Max is {_mb(max_bytes)}.")
+    content_type = (attachment.content_type or "").split(";")[0].strip().lower()
+    if content_type not in CONTENT_TYPES and content_type not in UNTYPED:
+        raise DownloadError("> That file isn't a supported image (PNG, JPG, GIF, WEBP, BMP).")
+    if attachment.width and attachment.height:
+        check_size(attachment.width, attachment.height, max_pixels)
+
+
+def _header_size(buf: bytearray):
+    # Pillow is imported here, not at startup; core.warm_imaging preloads it.
+    from PIL import Image, UnidentifiedImageError
+    try:
+        with Image.open(io.BytesIO(buf)) as img:
+            return img.size
+    except Image.DecompressionBombError:
+        raise DownloadError("> That image is too large.")
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError, EOFError):
+        return None  # header not complete yet
+
+
+async def fetch_image(session, url: str, max_bytes: int, max_pixels: int) -> bytes:
+    async with session.get(url) as resp:
+        if resp.status != 200:
+            raise DownloadError("> Failed to download the image.")
+
+        content_type = (resp.content_type or "").lower()
+        if content_type not in CONTENT_TYPES and content_type not in UNTYPED:
+            raise DownloadError("> That link isn't a supported image (PNG, JPG, GIF, WEBP, BMP).")
+        if resp.content_length is not None and resp.content_length > max_bytes:
+            raise DownloadError(f"> That image is too big. Max is {_mb(max_bytes)}.")
+
+        buf = bytearray()
+        sniffed = False
+        sized = False
+        async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+            buf += chunk
+            if len(buf) > max_bytes:
+                raise DownloadError(f"> That image is too big. Max is {_mb(max_bytes)}.")
+            if not sniffed and len(buf) >= 12:
+                if sniff_format(bytes(buf[:12])) is None:
+                    raise DownloadError("> That link isn't a supported image (PNG, JPG, GIF, WEBP, BMP).")
+                sniffed = True
+            if sniffed and not sized and len(buf) <= SNIFF_LIMIT:
+                size = _header_size(buf)
+                if size is not None:
+                    check_size(*size, max_pixels)
+                    sized = True
+
+    if not sniffed and sniff_format(bytes(buf[:12])) is None:
+        raise DownloadError("> That link isn't a supported image (PNG, JPG, GIF, WEBP, BMP).")
+    if not sized:
+        size = _header_size(buf)
+        if size is None:
+            raise DownloadError("> Couldn't read that image.")
+        check_size(*size, max_pixels)
+    return bytes(buf)
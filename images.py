@@ -0,0 +1,424 @@
+"""Pillow work for /gif, /caption and Quote, run in worker processes.
+
+Jobs are small frozen dataclasses so they pickle cheaply across the process
+boundary; each one knows how to render itself and returns the encoded bytes.
+Pillow is imported inside the functions that run in the workers, so the bot
+process can build jobs without paying for it at startup.
+"""
+import asyncio
+import importlib
+import io
+import multiprocessing
+import os
+import signal
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+import typeset
+from metrics import metrics
+
+try:
+    import resource
+except ImportError:  # Windows: no per-job CPU limit, the wall-clock timeout still applies
+    resource = None
+
+
+class ImageJobError(Exception):
+    pass
+
+
+class CpuLimitExceeded(ImageJobError):
+    pass
+
+
+class OutputTooLarge(ImageJobError):
+    pass
+
+
+class InputTooLarge(ImageJobError):
+    pass
+
+
+# ------------------ GIF ENCODING ------------------
+# Animations are capped at this many frames; longer ones keep every n-th
+# frame with the skipped frames' time folded into the kept ones.
+MAX_FRAMES = 300
+# Every frame still has to be decoded to reach the kept ones, so inputs over
+# this many pixels across all their frames are refused up front.
+MAX_DECODE_PIXELS = 400_000_000
+# The kept frames are all held as RGBA until they are encoded; past this many
+# pixels across them (160 MB) the frames are made smaller, down to half size,
+# and then fewer.
+MAX_HELD_PIXELS = 40_000_000
+PALETTE_SAMPLE_FRAMES = 8
+# 128 shared colors comes out smaller than Pillow's per-frame adaptive
+# palettes on typical inputs while still looking noticeably better.
+DEFAULT_COLORS = 128
+# Chat-sized output; bigger inputs are scaled down while decoding.
+DEFAULT_MAX_DIM = 720
+# Discord's default upload limit is 10 MiB; leave room for the request itself.
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024 - 256 * 1024
+# encode_gif_within gives up rather than shrink below this.
+MIN_DIM = 96
+
+
+# Modes Pillow resamples with a real filter; others (palette, 1-bit, 16-bit)
+# are converted before the final resize.
+FILTER_MODES = {"RGB", "RGBA", "L", "LA"}
+
+
+def _fit(size: tuple, max_dim: int) -> tuple:
+    width, height = size
+    scale = max_dim / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _scaled_rgba(frame, max_dim: int = None):
+    # Shrinks before converting, so a big frame is never held as full-size
+    # RGBA. resize() returns a copy; thumbnail() would change the sequence
+    # frame itself and break the seek to the next one.
+    from PIL import Image
+    if not max_dim or max(frame.size) <= max_dim:
+        return frame.convert("RGBA")
+    if frame.mode not in FILTER_MODES:
+        # NEAREST is all a palette image gets; only use it to get within 2x
+        # of the target, then filter properly once converted
+        if max(frame.size) > 2 * max_dim:
+            frame = frame.resize(_fit(frame.size, 2 * max_dim), Image.NEAREST)
+        frame = frame.convert("RGBA")
+    # reducing_gap lets Pillow reduce() by whole factors first, like thumbnail()
+    return frame.resize(_fit(frame.size, max_dim), Image.LANCZOS, reducing_gap=2.0).convert("RGBA")
+
+
+def load_frames(img, max_dim: int = None):
+    # Full RGBA frames no larger than max_dim (smaller for long animations,
+    # see MAX_HELD_PIXELS), plus per-frame durations and the loop count, or
+    # None when the source doesn't say (which a GIF reads as "play once").
+    from PIL import ImageSequence
+    if max_dim and img.format == "JPEG":
+        # let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full size
+        img.draft("RGB", (max_dim, max_dim))
+
+    n_frames = getattr(img, "n_frames", 1)
+    width, height = img.size
+    if width * height * n_frames > MAX_DECODE_PIXELS:
+        raise InputTooLarge(f"{n_frames} frames at {width}x{height}")
+    # Decide up front which frames to keep and at what size, so the skipped
+    # ones are only decoded, never converted or held.
+    step = -(-n_frames // MAX_FRAMES)
+    size = _fit(img.size, max_dim) if max_dim and max(img.size) > max_dim else img.size
+    kept = -(-n_frames // step)
+    if kept * size[0] * size[1] > MAX_HELD_PIXELS:
+        scale = (MAX_HELD_PIXELS / (kept * size[0] * size[1])) ** 0.5
+        max_dim = max(round(max(size) * scale), max(size) // 2, MIN_DIM)
+        size = _fit(img.size, max_dim)
+        step = max(step, -(-n_frames // max(1, MAX_HELD_PIXELS // (size[0] * size[1]))))
+
+    frames, durations = [], []
+    for index, frame in enumerate(ImageSequence.Iterator(img)):
+        duration = frame.info.get("duration", 100)
+        if index % step:
+            durations[-1] += duration
+            continue
+        frames.append(_scaled_rgba(frame, max_dim))
+        durations.append(duration)
+    loop = img.info.get("loop") if n_frames > 1 else None
+    return frames, durations, loop
+
+
+def _shared_palette(frames, colors: int):
+    # Quantize a strip of thumbnails from across the animation so every frame
+    # is mapped onto one palette; per-frame palettes flicker and cost a local
+    # color table each.
+    from PIL import Image
+    step = max(1, len(frames) // PALETTE_SAMPLE_FRAMES)
+    thumbs = []
+    for frame in frames[::step][:PALETTE_SAMPLE_FRAMES]:
+        thumb = frame.convert("RGB")
+        thumb.thumbnail((128, 128))
+        thumbs.append(thumb)
+    strip = Image.new("RGB", (sum(t.width for t in thumbs), max(t.height for t in thumbs)))
+    x = 0
+    for thumb in thumbs:
+        strip.paste(thumb, (x, 0))
+        x += thumb.width
+    return strip.quantize(colors=colors)
+
+
+def encode_gif(frames, durations=None, loop=None, colors: int = DEFAULT_COLORS) -> bytes:
+    from PIL import Image
+    transparent = any(frame.getextrema()[3][0] < 128 for frame in frames)
+    # the last palette slot is kept free for transparent pixels
+    palette = _shared_palette(frames, colors - 1 if transparent else colors)
+    transparent_index = colors - 1
+
+    out = []
+    for frame in frames:
+        # no dithering: the noise it adds compresses badly under LZW
+        indexed = frame.convert("RGB").quantize(palette=palette, dither=Image.Dither.NONE)
+        if transparent:
+            indexed.paste(transparent_index, mask=frame.getchannel("A").point(lambda a: 255 if a < 128 else 0))
+        out.append(indexed)
+
+    options = {}
+    if transparent:
+        options["transparency"] = transparent_index
+    if len(out) > 1:
+        # Pillow stores each frame cropped to the box that changed from the
+        # previous one. With transparency each frame has to clear the last
+        # one (disposal 2); without it frames can just be drawn on top.
+        options.update(save_all=True, append_images=out[1:], duration=durations, disposal=2 if transparent else 1)
+        if loop is not None:
+            options["loop"] = loop
+
+    buf = io.BytesIO()
+    out[0].save(buf, format="GIF", **options)
+    return buf.getvalue()
+
+
+def encode_gif_within(frames, durations=None, loop=None, max_bytes: int = DEFAULT_MAX_BYTES) -> bytes:
+    # Fewer colors first (cheap, and often enough), then smaller frames.
+    from PIL import Image
+    colors = DEFAULT_COLORS
+    while True:
+        data = encode_gif(frames, durations, loop, colors)
+        if len(data) <= max_bytes:
+            return data
+        if colors > 32:
+            colors //= 2
+            continue
+
+        width, height = frames[0].size
+        # file size scales roughly with area, so aim a little under the budget
+        scale = min(0.9, max(0.5, (max_bytes / len(data)) ** 0.5 * 0.95))
+        new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        if max(new_size) < MIN_DIM:
+            raise OutputTooLarge(f"GIF is still {len(data)} bytes at {width}x{height}")
+        # in place rather than a second list, so only one size is held at once
+        for i, frame in enumerate(frames):
+            frames[i] = frame.resize(new_size, Image.LANCZOS)
+
+
+@dataclass(frozen=True)
+class GifJob:
+    data: bytes
+    max_dim: int = DEFAULT_MAX_DIM
+    max_bytes: int = DEFAULT_MAX_BYTES
+
+    def run(self) -> bytes:
+        from PIL import Image
+        frames, durations, loop = load_frames(Image.open(io.BytesIO(self.data)), self.max_dim)
+        return encode_gif_within(frames, durations, loop, self.max_bytes)
+
+
+def render_caption_band(width: int, height: int, text: str, font_path=None, max_lines: int = 4):
+    # Caption area (~15% of image height, at least 50px), taller if the
+    # text needs more than one line
+    from PIL import Image, ImageDraw
+    base_height = max(50, int(height * 0.15))
+    pad = max(5, base_height // 10)
+    size, lines = typeset.fit(text, font_path, width - 2 * pad, base_height - 10, 12, max_lines)
+    font = typeset.get_font(font_path, size)
+    line_height = typeset.line_height(font_path, size)
+    caption_height = max(base_height, line_height * len(lines) + 2 * pad)
+
+    band = Image.new("RGBA", (width, caption_height), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(band)
+    y = (caption_height - line_height * len(lines)) // 2  # center in caption area
+    for line in lines:
+        draw.text((width // 2, y), line, font=font, fill="black", anchor="ma")
+        y += line_height
+    return band
+
+
+@dataclass(frozen=True)
+class CaptionJob:
+    data: bytes
+    text: str
+    max_dim: int = DEFAULT_MAX_DIM
+    max_bytes: int = DEFAULT_MAX_BYTES
+    font_path: str = None
+
+    MAX_LINES = 4
+
+    def run(self) -> bytes:
+        from PIL import Image
+        frames, durations, loop = load_frames(Image.open(io.BytesIO(self.data)), self.max_dim)
+        width, height = frames[0].size
+
+        band = render_caption_band(width, height, self.text, self.font_path, self.MAX_LINES)
+        caption_height = band.height
+
+        # in place, so each source frame is freed as its captioned copy is made
+        for i, frame in enumerate(frames):
+            new_img = Image.new("RGBA", (width, height + caption_height), (255, 255, 255, 255))
+            new_img.paste(band, (0, 0))
+            new_img.paste(frame, (0, caption_height))
+            frames[i] = new_img
+        return encode_gif_within(frames, durations, loop, self.max_bytes)
+
+
+@dataclass(frozen=True)
+class QuoteJob:
+    avatar: bytes
+    text: str
+    display_name: str
+    username: str
+    color: bool = True
+    font_path: str = None
+
+    WIDTH = 1024
+    HEIGHT = 512
+    MAX_FONT = 48
+    MIN_FONT = 18
+    MAX_LINES = 8
+
+    def run(self) -> bytes:
+        from PIL import Image, ImageDraw
+        canvas = Image.new("RGB", (self.WIDTH, self.HEIGHT), (0, 0, 0))
+
+        avatar = Image.open(io.BytesIO(self.avatar)).convert("RGB")
+        avatar = avatar.resize((self.HEIGHT, self.HEIGHT), Image.LANCZOS)
+        if not self.color:
+            avatar = avatar.convert("L").convert("RGB")
+        # fade the avatar's right half into the black background
+        fade = Image.linear_gradient("L").rotate(-90).resize((self.HEIGHT, self.HEIGHT))
+        fade = fade.point(lambda v: min(255, v * 2))
+        canvas.paste(avatar, (0, 0), fade)
+
+        left = self.HEIGHT + 16
+        column = self.WIDTH - left - 40
+        size, lines = typeset.fit(self.text, self.font_path, column, self.MAX_FONT, self.MIN_FONT, self.MAX_LINES)
+        font = typeset.get_font(self.font_path, size)
+        name_font = typeset.get_font(self.font_path, max(self.MIN_FONT, size * 2 // 3))
+        handle_font = typeset.get_font(self.font_path, max(14, size // 2))
+        line_height = int(size * 1.25)
+        block = line_height * len(lines) + int(name_font.size * 1.6) + int(handle_font.size * 1.4)
+
+        draw = ImageDraw.Draw(canvas)
+        center = left + column // 2
+        y = (self.HEIGHT - block) // 2
+        for line in lines:
+            draw.text((center, y), line, font=font, fill="white", anchor="ma")
+            y += line_height
+        y += int(name_font.size * 0.6)
+        draw.text((center, y), f"- {self.display_name}", font=name_font, fill="white", anchor="ma")
+        y += int(name_font.size * 1.4)
+        draw.text((center, y), f"@{self.username}", font=handle_font, fill=(140, 140, 140), anchor="ma")
+
+        if not self.color:
+            canvas = canvas.convert("L")
+        return encode_gif([canvas.convert("RGBA")])
+
+
+# ------------------ WORKER PROCESS SIDE ------------------
+WORKER_MODULES = ("PIL.Image", "PIL.ImageDraw", "PIL.ImageFont", "PIL.ImageSequence")
+
+
+def _on_cpu_limit(signum, frame):
+    raise CpuLimitExceeded("image job hit its CPU time limit")
+
+
+def _init_worker():
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    # Pay for Pillow while the pool spins up rather than on the first job.
+    for module in WORKER_MODULES:
+        importlib.import_module(module)
+
+
+def _noop():
+    pass
+
+
+def _run_job(job, cpu_seconds: int) -> bytes:
+    if resource is None or not cpu_seconds:
+        return job.run()
+
+    # RLIMIT_CPU counts the whole process lifetime, so move the soft limit
+    # to "CPU used so far + budget" for the duration of this job.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    try:
+        return job.run()
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+# ------------------ BOT SIDE ------------------
+# The pool is also rebuilt from inside the running bot after a timeout, when
+# the access store, to_thread and watchdog threads exist; forking then can
+# deadlock the child on a lock one of them held. forkserver (spawn where it
+# isn't available) starts workers from a clean single-threaded process.
+MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class ImageWorker:
+    def __init__(self, workers: int = None, timeout: float = 15.0, cpu_seconds: int = 10):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self._pool = None
+        # One job per worker: the pool never has a backlog, so `timeout`
+        # counts from when a worker picks the job up, not from submit.
+        self._slots = asyncio.Semaphore(self.workers)
+        # Pools _reset() tore down; the jobs it broke get one retry.
+        self._retired = weakref.WeakSet()
+
+    def start(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=MP_CONTEXT, initializer=_init_worker)
+        # launch the processes now instead of on the first user's job
+        for _ in range(self.workers):
+            self._pool.submit(_noop)
+
+    async def run(self, job) -> bytes:
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            for attempt in range(2):
+                if self._pool is None:
+                    self.start()
+                pool = self._pool
+                future = loop.run_in_executor(pool, _run_job, job, self.cpu_seconds)
+                try:
+                    with metrics.stage("render"):
+                        return await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    self._reset(pool)
+                    raise ImageJobError(f"image job took longer than {self.timeout}s")
+                except BrokenProcessPool:
+                    if attempt == 0 and pool in self._retired:
+                        # torn down for another job; this one gets a new pool
+                        metrics.inc("image_job_retries")
+                        continue
+                    self._reset(pool)
+                    raise ImageJobError("image worker process died")
+
+    def pids(self) -> list:
+        pool = self._pool
+        return list(pool._processes or {}) if pool is not None else []
+
+    def _reset(self, pool):
+        if self._pool is not pool:
+            return  # someone already replaced it
+        self._pool = None
+        self._retired.add(pool)
+        # A running job can't be cancelled, so stop its worker outright. Other
+        # jobs on this pool fail with BrokenProcessPool and are retried once
+        # on the new pool, which the next job starts.
+        for proc in list((pool._processes or {}).values()):
+            proc.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,149 @@
+"""Run the bot as several processes, each with its own slice of the shards.
+
+    python launcher.py --processes 4
+    python launcher.py --processes 2 --shards 8
+
+Point PM2 at this file instead of main.py. The shard count comes from
+--shards, then config.SHARD_COUNT, then Discord's recommendation. Each child
+is a normal main.py told its shards through BOT_SHARD_COUNT, BOT_SHARD_IDS,
+BOT_PROCESS_INDEX and BOT_PROCESS_COUNT. The children share rate-limit
+buckets and change notifications through the SQLite file in
+BOT_SHARED_STATE (see shared_state.py), and rendered quotes through the
+quote cache directory. Process 0 runs migrations and syncs the command tree.
+
+Children are started one after another, spaced by Discord's identify rate
+limit. A child that exits is restarted with a growing back-off. SIGINT or
+SIGTERM stops them all.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import config
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+# Discord allows max_concurrency identifies per this many seconds.
+IDENTIFY_INTERVAL = 5.0
+STOP_TIMEOUT = 15.0
+# A child that stayed up this long gets its back-off reset.
+HEALTHY_SECONDS = 60.0
+
+
+def gateway_info() -> tuple:
+    # (recommended shard count, identify max_concurrency)
+    request = urllib.request.Request(GATEWAY_URL, headers={"Authorization": f"Bot {config.TOKEN}"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        data = json.load(response)
+    return data["shards"], data["session_start_limit"]["max_concurrency"]
+
+
+def assign_shards(shards: int, processes: int) -> list:
+    # Round robin, so every process gets the same number give or take one.
+    return [[shard for shard in range(shards) if shard % processes == index] for index in range(processes)]
+
+
+class Child:
+    def __init__(self, index: int, shard_ids: list, env: dict):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.env = env
+        self.proc = None
+        self.started = 0.0
+        self.failures = 0
+        self.restart_at = None
+
+    def start(self):
+        self.proc = subprocess.Popen([sys.executable, MAIN], env=self.env)
+        self.started = time.monotonic()
+        self.restart_at = None
+        print(f"[launcher] process {self.index} (pid {self.proc.pid}) running shards {self.shard_ids}")
+
+
+def child_env(index: int, processes: int, shards: int, shard_ids: list, state_path: str) -> dict:
+    env = dict(os.environ)
+    env.update(
+        BOT_PROCESS_INDEX=str(index),
+        BOT_PROCESS_COUNT=str(processes),
+        BOT_SHARD_COUNT=str(shards),
+        BOT_SHARD_IDS=",".join(map(str, shard_ids)),
+        BOT_SHARED_STATE=state_path,
+    )
+    return env
+
+
+def run(args):
+    max_concurrency = 1
+    shards = args.shards or getattr(config, "SHARD_COUNT", None)
+    if not shards:
+        shards, max_concurrency = gateway_info()
+    processes = min(args.processes, shards)
+    state_path = args.state or getattr(config, "SHARED_STATE_PATH", None) or "cache/shared_state.sqlite3"
+
+    children = [
+        Child(index, shard_ids, child_env(index, processes, shards, shard_ids, state_path))
+        for index, shard_ids in enumerate(assign_shards(shards, processes))
+    ]
+    print(f"[launcher] {shards} shards over {processes} processes, shared state in {state_path}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        for child in children:
+            if stopping:
+                break
+            child.start()
+            # each process identifies its shards one bucket at a time
+            time.sleep(IDENTIFY_INTERVAL * -(-len(child.shard_ids) // max_concurrency))
+
+        while not stopping:
+            now = time.monotonic()
+            for child in children:
+                if child.proc is None:
+                    continue
+                if child.restart_at is not None:
+                    if now >= child.restart_at:
+                        child.start()
+                    continue
+                code = child.proc.poll()
+                if code is None:
+                    continue
+                child.failures = 0 if now - child.started >= HEALTHY_SECONDS else child.failures + 1
+                delay = min(60.0, 2.0 ** child.failures)
+                print(f"[launcher] process {child.index} exited with {code}, restarting in {delay:.0f}s")
+                child.restart_at = now + delay
+            time.sleep(1)
+    finally:
+        running = [child.proc for child in children if child.proc is not None and child.proc.poll() is None]
+        for proc in running:
+            proc.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for proc in running:
+            try:
+                proc.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shards", type=int, default=None, help="total shard count")
+    parser.add_argument("--state", default=None, help="path of the shared SQLite state file")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Event-loop lag watchdog.
+
+A daemon thread pings the loop every `interval` seconds and times how long
+the callback takes to run. If it hasn't run within `threshold`, something is
+blocking the loop, so the thread grabs the loop thread's current stack and
+logs it along with the app command that was executing. Recent lag samples
+are kept for percentiles, e.g. in /stats.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from metrics import metrics
+
+ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, window: int = 3000):
+        self.threshold = threshold
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.blocked = 0
+        self._loop = None
+        self._loop_thread = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, loop):
+        # Call from the loop's own thread, e.g. in setup_hook.
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def percentile(self, q: float) -> float:
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            answered = threading.Event()
+            sent = time.perf_counter()
+            try:
+                self._loop.call_soon_threadsafe(self._answer, answered, sent)
+            except RuntimeError:
+                return  # loop closed
+            if answered.wait(self.threshold):
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = _format_stack(frame)
+            command = _running_command(frame)
+            answered.wait()
+            lag = time.perf_counter() - sent
+            self.blocked += 1
+            print(f"Event loop blocked for {lag * 1000:.0f}ms in {command or 'no command'}:\n{stack}", end="")
+
+    def _answer(self, answered: threading.Event, sent: float):
+        # Runs on the loop, so samples and metrics are only touched from there.
+        lag = time.perf_counter() - sent
+        self.samples.append(lag)
+        metrics.observe("loop_lag_seconds", lag, command="-")
+        answered.set()
+
+
+def _format_stack(frame) -> str:
+    if frame is None:
+        return "<no frame>\n"
+    entries = traceback.extract_stack(frame)
+    # drop the event loop's own frames; the blocking coroutine starts after them
+    start = max((i + 1 for i, entry in enumerate(entries) if entry.filename.startswith(ASYNCIO_DIR)), default=0)
+    return "".join(traceback.format_list(entries[start:] or entries))
+
+
+def _running_command(frame):
+    # command_cooldown's wrapper keeps the command name in a local, so the
+    # innermost wrapper frame on the stack says which command is running.
+    while frame is not None:
+        if frame.f_code.co_name == "wrapper" and frame.f_globals.get("__name__") == "core":
+            command = frame.f_locals.get("command")
+            if command:
+                return f"/{command}"
+        frame = frame.f_back
+    return None
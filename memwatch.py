@@ -0,0 +1,141 @@
+"""Memory diagnostics for the long-running process.
+
+proc_memory() reads resident and peak memory for a process from /proc (empty
+where that isn't available). Tracer wraps tracemalloc: each snapshot() is
+diffed against the previous one, so two calls some hours apart show which
+lines kept allocating. MemoryGuard checks RSS on a timer and, once it is over
+the soft ceiling, runs the trim callbacks (cache trims, rate-limit sweep),
+then release_memory() so the memory goes back to the OS without a restart.
+"""
+import ctypes
+import ctypes.util
+import gc
+import os
+import tracemalloc
+
+# tracemalloc's own bookkeeping and the import machinery are noise in a diff.
+TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def proc_memory(pid="self") -> dict:
+    # {"rss": bytes, "peak": bytes} from /proc/<pid>/status; {} elsewhere.
+    fields = {"VmRSS:": "rss", "VmHWM:": "peak"}
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in fields:
+                    memory[fields[parts[0]]] = int(parts[1]) * 1024
+    except (OSError, ValueError):
+        return {}
+    return memory
+
+
+def rss_bytes(pid="self"):
+    return proc_memory(pid).get("rss")
+
+
+def fmt_bytes(n) -> str:
+    if n is None:
+        return "n/a"
+    sign = "-" if n < 0 else ""
+    n = abs(n)
+    for unit in ("B", "KiB", "MiB"):
+        if n < 1024:
+            return f"{sign}{n:.0f}{unit}" if unit == "B" else f"{sign}{n:.1f}{unit}"
+        n /= 1024
+    return f"{sign}{n:.2f}GiB"
+
+
+def _where(traceback) -> str:
+    frame = traceback[0]
+    path = frame.filename
+    cwd = os.getcwd() + os.sep
+    if path.startswith(cwd):
+        path = path[len(cwd):]
+    elif os.path.isabs(path):
+        # site-packages and the stdlib: the last two parts are enough
+        path = os.path.join(*path.split(os.sep)[-2:])
+    return f"{path}:{frame.lineno}"
+
+
+class Tracer:
+    def __init__(self, frames: int = 1, top: int = 10):
+        self.frames = frames
+        self.top = top
+        self._previous = None
+        self.snapshots = 0
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._previous = None
+        self.snapshots = 0
+
+    def stop(self):
+        tracemalloc.stop()
+        self._previous = None
+        self.snapshots = 0
+
+    def snapshot(self) -> list:
+        # Lines for the biggest allocation sites on the first call, then for
+        # the sites that grew the most since the previous call. Slow with
+        # many live objects, so run it in a thread.
+        snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+        previous, self._previous = self._previous, snapshot
+        self.snapshots += 1
+        if previous is None:
+            return [
+                f"{fmt_bytes(stat.size):>10} {stat.count:>7} blk  {_where(stat.traceback)}"
+                for stat in snapshot.statistics("lineno")[:self.top]
+            ]
+        return [
+            f"{('+' if stat.size_diff >= 0 else '') + fmt_bytes(stat.size_diff):>10} "
+            f"{stat.count_diff:>+7} blk  {_where(stat.traceback)} ({fmt_bytes(stat.size)})"
+            for stat in snapshot.compare_to(previous, "lineno")[:self.top]
+        ]
+
+
+def release_memory():
+    # A full gc pass, then malloc_trim: glibc keeps freed arenas mapped and
+    # this hands them back to the OS. Elsewhere only the gc pass happens.
+    gc.collect()
+    name = ctypes.util.find_library("c")
+    if not name:
+        return
+    try:
+        ctypes.CDLL(name).malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class MemoryGuard:
+    def __init__(self, soft_limit: int, trim=None):
+        self.soft_limit = soft_limit  # bytes of RSS
+        self._trim = trim
+        self.triggered = 0
+
+    def trim(self):
+        if self._trim is not None:
+            self._trim()
+        release_memory()
+
+    def check(self):
+        # Trims when RSS is over the soft limit; returns (before, after) then,
+        # None otherwise.
+        before = rss_bytes()
+        if before is None or before < self.soft_limit:
+            return None
+        self.triggered += 1
+        self.trim()
+        return before, rss_bytes()
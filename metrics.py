@@ -0,0 +1,139 @@
+"""In-process metrics: latency histograms and counters, labelled by command.
+
+command_cooldown (core.py) sets `current_command` and records the whole call,
+time to first response, rejections and errors. Code further down only wraps
+its slow part in `metrics.stage("...")`, and the time is filed under whichever
+command is running. Everything is plain counters in memory; /stats reads them
+and serve() exposes them in Prometheus text format.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds in seconds; one overflow bucket follows.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+current_command = ContextVar("current_command", default=None)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation; inf if it
+        # landed past the last bucket.
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if n and seen >= rank:
+                return bound
+        return 0.0
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = {}    # (name, labels) -> int
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        if "command" not in labels:
+            labels["command"] = current_command.get() or "-"
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def inc(self, name: str, n: int = 1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def count(self, name: str, **labels) -> int:
+        # Sum of a counter over every label set matching `labels`.
+        wanted = set(labels.items())
+        return sum(n for (key, lbl), n in self.counters.items() if key == name and wanted <= set(lbl))
+
+    def merged(self, name: str, **labels) -> Histogram:
+        # One histogram summing every label set matching `labels`.
+        wanted = set(labels.items())
+        total = Histogram()
+        for (key, lbl), histogram in self.histograms.items():
+            if key == name and wanted <= set(lbl):
+                total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+                total.count += histogram.count
+                total.sum += histogram.sum
+        return total
+
+    def label_values(self, name: str, label: str) -> list:
+        values = {dict(lbl).get(label) for key, lbl in (*self.histograms, *self.counters) if key == name}
+        return sorted(v for v in values if v is not None)
+
+    def prometheus(self, prefix: str = "bot") -> str:
+        def fmt(labels, extra=()):
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            body = ",".join(f'{k}="{str(v)}"' for k, v in pairs)
+            return "{" + body + "}"
+
+        lines = []
+        for name in sorted({key for key, _ in self.counters}):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for (key, labels), n in sorted(self.counters.items()):
+                if key == name:
+                    lines.append(f"{prefix}_{name}{fmt(labels)} {n}")
+        for name in sorted({key for key, _ in self.histograms}):
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for (key, labels), h in sorted(self.histograms.items()):
+                if key != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{prefix}_{name}_bucket{fmt(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{prefix}_{name}_sum{fmt(labels)} {h.sum:.6f}")
+                lines.append(f"{prefix}_{name}_count{fmt(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+async def serve(port: int, host: str = "127.0.0.1"):
+    # Optional scrape endpoint. Returns the runner so the caller can clean up.
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=metrics.prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,65 @@
+"""Versioned schema migrations, run once at startup.
+
+The applied version is kept in the `migrations` collection. Each step is
+written to be safe to run again, so a crash halfway through just means the
+same step runs on the next start. Like the rest of the Mongo code they run
+in the access store's threads, which is also where pymongo gets imported.
+"""
+STATE_ID = "schema"
+
+
+def _int_user_ids(db):
+    # user_access: string ids -> int64, drop duplicates and junk, unique index.
+    from pymongo import DeleteOne, UpdateMany
+
+    coll = db["user_access"]
+    for name, info in coll.index_information().items():
+        if info["key"] == [("userId", 1)] and not info.get("unique"):
+            coll.drop_index(name)
+
+    seen = set()
+    ops = []
+    for doc in coll.find({}, {"userId": 1}):
+        try:
+            user_id = int(doc.get("userId"))
+        except (TypeError, ValueError):
+            ops.append(DeleteOne({"_id": doc["_id"]}))
+            continue
+        if user_id in seen:
+            ops.append(DeleteOne({"_id": doc["_id"]}))
+            continue
+        seen.add(user_id)
+        if type(doc["userId"]) is not int:
+            # filtering on _id, so UpdateMany touches exactly one document
+            ops.append(UpdateMany({"_id": doc["_id"]}, {"$set": {"userId": user_id}}))
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+    coll.create_index("userId", unique=True)
+
+
+# (version, description, step); append only.
+MIGRATIONS = (
+    (1, "int64 user ids with a unique index", _int_user_ids),
+)
+
+
+def current_version(db) -> int:
+    state = db["migrations"].find_one({"_id": STATE_ID})
+    return state["version"] if state else 0
+
+
+def pending(db) -> bool:
+    return current_version(db) < MIGRATIONS[-1][0]
+
+
+def migrate(db) -> list:
+    # Applies every pending step in order and returns their descriptions.
+    version = current_version(db)
+    applied = []
+    for target, description, step in MIGRATIONS:
+        if target <= version:
+            continue
+        step(db)
+        db["migrations"].update_one({"_id": STATE_ID}, {"$set": {"version": target}}, upsert=True)
+        applied.append(description)
+    return applied
@@ -0,0 +1,92 @@
+"""Quote image backends.
+
+"api" posts the payload to the fakequote service and converts the PNG it
+links to; "local" renders the same layout with Pillow in the image worker
+pool and only has to fetch the avatar. Both return GIF bytes.
+
+Calls to the service each get their own deadline and can go through a
+CircuitBreaker, which raises resilience.CircuitOpen instead of waiting on a
+service that keeps failing.
+"""
+import asyncio
+import re
+from contextlib import nullcontext
+
+import aiohttp
+
+from images import GifJob, QuoteJob
+from resilience import hedged
+
+BACKENDS = ("api", "local")
+DEFAULT_API_URL = "https://api.voids.top/fakequote"
+
+
+class QuoteError(Exception):
+    # The message is meant for the user. fallback_url is set when a PNG was
+    # produced upstream but could not be converted.
+    def __init__(self, message: str, fallback_url: str = None):
+        super().__init__(message)
+        self.fallback_url = fallback_url
+
+
+async def _download_png(session, png_url: str, timeout: float) -> bytes:
+    async with session.get(png_url, timeout=aiohttp.ClientTimeout(total=timeout)) as img_resp:
+        if img_resp.status != 200:
+            raise QuoteError("> Failed to download generated image.")
+        return await img_resp.read()
+
+
+async def render_api(session, worker, quote_data: dict, api_url: str, breaker=None,
+                     timeout: float = 8.0, png_timeout: float = 5.0, hedge_delay: float = None) -> bytes:
+    # timeout/png_timeout bound each request; with hedge_delay set, a second
+    # PNG download starts if the first hasn't finished by then.
+    try:
+        async with breaker.guard() if breaker is not None else nullcontext():
+            async with session.post(api_url, json=quote_data, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status >= 500:
+                    raise QuoteError("> Failed to generate quote image")
+                response_text = await response.text()
+
+            url_match = re.search(r'https?://[^\s"]+\.png', response_text)
+            if not url_match:
+                raise QuoteError("> Failed to generate quote image")
+
+            png_url = url_match.group(0)
+
+            if hedge_delay:
+                img_bytes = await hedged(lambda: _download_png(session, png_url, png_timeout), hedge_delay)
+            else:
+                img_bytes = await _download_png(session, png_url, png_timeout)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Quote API request failed: {e!r}")
+        raise QuoteError("> The quote service isn't responding, try again in a bit.")
+
+    try:
+        return await worker.run(GifJob(img_bytes))
+    except Exception as e:
+        print(f"Error converting quote PNG to GIF: {e}")
+        raise QuoteError("> Failed to convert the quote image.", fallback_url=png_url)
+
+
+async def fetch_avatar(session, url: str, cache) -> bytes:
+    data = await cache.get(url)
+    if data is None:
+        async with session.get(url) as resp:
+            if resp.status != 200:
+                raise QuoteError("> Failed to download the avatar.")
+            data = await resp.read()
+        await cache.put(url, data)
+    return data
+
+
+async def render_local(session, worker, quote_data: dict, avatar_cache, font_path: str = None) -> bytes:
+    avatar = await fetch_avatar(session, quote_data["avatar"], avatar_cache)
+    job = QuoteJob(
+        avatar=avatar,
+        text=quote_data["text"],
+        display_name=quote_data["display_name"],
+        username=quote_data["username"],
+        color=quote_data.get("color", True),
+        font_path=font_path,
+    )
+    return await worker.run(job)
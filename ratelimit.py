@@ -0,0 +1,45 @@
+"""Per-user token buckets for command rate limiting.
+
+Every user gets a bucket of `burst` tokens that refills at `rate` tokens per
+second, and each command spends its own cost. Buckets live in an LRU capped
+at `max_users`; sweep() also drops buckets that have refilled completely,
+since a full bucket is what a new user gets anyway. Memory stays flat no
+matter how many distinct users show up.
+"""
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    def __init__(self, rate: float = 0.5, burst: float = 3.0, max_users: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets = OrderedDict()  # key -> (tokens, last update)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key, cost: float = 1.0) -> float:
+        # Spends `cost` tokens and returns 0, or returns how many seconds
+        # until the bucket would have enough.
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / self.rate
+        self._buckets[key] = (tokens - cost, now)
+        if len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+        return 0.0
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        full = [
+            key for key, (tokens, last) in self._buckets.items()
+            if tokens + (now - last) * self.rate >= self.burst
+        ]
+        for key in full:
+            del self._buckets[key]
+        return len(full)
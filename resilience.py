@@ -0,0 +1,94 @@
+"""Failure handling for calls to upstream services.
+
+CircuitBreaker stops calling a service after `failure_threshold` failures in
+a row and fails fast with CircuitOpen. Once `reset_timeout` has passed it
+lets a single probe call through; a success closes the breaker again. hedged()
+starts a backup attempt when the first is slow and keeps whichever finishes
+first.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        # a failed probe re-opens straight away
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def guard(self):
+        # Any exception in the block counts as a failure; cancellation doesn't.
+        if not self.allow():
+            raise CircuitOpen()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self._probing = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+
+
+async def hedged(factory, delay: float, attempts: int = 2):
+    # Runs factory() and, while nothing has succeeded, starts another attempt
+    # every `delay` seconds (or right away after a failure), up to `attempts`.
+    # Returns the first result; raises the last error if every attempt fails.
+    tasks = []
+    pending = set()
+    error = None
+    try:
+        while True:
+            if len(tasks) < attempts:
+                task = asyncio.ensure_future(factory())
+                tasks.append(task)
+                pending.add(task)
+            timeout = delay if len(tasks) < attempts else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            if not pending and len(tasks) >= attempts:
+                raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,127 @@
+"""Content-addressed cache for rendered images.
+
+Entries are keyed by a hash of the job payload. Recent results stay in a
+byte-budgeted in-memory LRU; every result is also written to a directory on
+disk so the cache survives PM2 restarts, and that directory is pruned oldest
+first once it goes over its own budget.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+
+def payload_key(payload: dict) -> str:
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, directory: str = None, disk_max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._disk_size = None  # scanned on first write
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    async def get(self, key: str):
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+        if self.directory:
+            data = await asyncio.to_thread(self._read, key)
+            if data is not None:
+                self._remember(key, data)
+                self.hits += 1
+                return data
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        if self.directory:
+            await asyncio.to_thread(self._write, key, data)
+
+    def trim(self, max_bytes: int):
+        while self._entries and self._size > max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self._size -= len(old)
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = data
+        self._size += len(data)
+        self.trim(self.max_bytes)
+
+    # ------------------ DISK (runs in a thread) ------------------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _read(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # mtime doubles as last-used time for pruning
+        return data
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        existed = os.path.exists(path)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        if self._disk_size is None:
+            self._disk_size = sum(size for _, size, _ in self._scan())
+        elif not existed:
+            self._disk_size += len(data)
+        if self._disk_size > self.disk_max_bytes:
+            self._prune()
+
+    def _scan(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _prune(self):
+        files = sorted(self._scan(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * 0.9
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_size = total
@@ -0,0 +1,96 @@
+"""Admission control for heavy commands.
+
+At most `concurrency` jobs run at once and at most `max_queue` wait behind
+them; anything past that is refused straight away. Waiting jobs are kept per
+user and granted round-robin, so one user queueing ten jobs doesn't push
+everyone else back ten places.
+"""
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+
+class QueueFull(Exception):
+    pass
+
+
+class FairScheduler:
+    def __init__(self, concurrency: int = 4, max_queue: int = 32):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.running = 0
+        self.queued = 0
+        # user -> waiting futures; dict order is the round-robin ring
+        self._waiting = OrderedDict()
+
+    def full(self) -> bool:
+        return self.running >= self.concurrency and self.queued >= self.max_queue
+
+    def position(self, fut) -> int:
+        # 1-based place in line, walking the ring one job per user per round
+        queues = [list(q) for q in self._waiting.values()]
+        place = 0
+        for depth in range(max((len(q) for q in queues), default=0)):
+            for q in queues:
+                if depth < len(q):
+                    place += 1
+                    if q[depth] is fut:
+                        return place
+        return place
+
+    @asynccontextmanager
+    async def slot(self, user_id, on_queued=None):
+        # on_queued(position) is awaited once if the job has to wait.
+        await self._acquire(user_id, on_queued)
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._grant()
+
+    async def _acquire(self, user_id, on_queued):
+        if self.running < self.concurrency and not self.queued:
+            self.running += 1
+            return
+        if self.queued >= self.max_queue:
+            raise QueueFull()
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(fut)
+        self.queued += 1
+        try:
+            if on_queued is not None:
+                await on_queued(self.position(fut))
+            await fut
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                # the slot was handed to us just as we gave up; pass it on
+                self.running -= 1
+                self._grant()
+            else:
+                fut.cancel()
+                self._discard(user_id, fut)
+            raise
+
+    def _discard(self, user_id, fut):
+        queue = self._waiting.get(user_id)
+        if queue is None or fut not in queue:
+            return
+        queue.remove(fut)
+        self.queued -= 1
+        if not queue:
+            del self._waiting[user_id]
+
+    def _grant(self):
+        while self.running < self.concurrency and self._waiting:
+            user_id, queue = next(iter(self._waiting.items()))
+            fut = queue.popleft()
+            self.queued -= 1
+            # served users go to the back of the ring
+            del self._waiting[user_id]
+            if queue:
+                self._waiting[user_id] = queue
+            if fut.done():
+                continue
+            self.running += 1
+            fut.set_result(None)
@@ -0,0 +1,139 @@
+"""State shared between the bot processes started by launcher.py.
+
+A small SQLite database in WAL mode, so it works for any number of
+processes on one machine without another service to run. It holds:
+
+- token buckets, through SharedRateLimiter (same interface as RateLimiter),
+  so a user gets one budget whichever shard their interaction lands on;
+- version counters used as invalidation signals: a process bumps a name
+  after changing something (the access list, the loaded extensions) and the
+  others notice on their next changed() poll.
+
+Rendered quotes are already shared through result_cache's disk directory.
+Every call is one short transaction made straight from the event loop. A
+database that stays locked for longer than `timeout` fails open instead of
+stalling the loop.
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from metrics import metrics
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated)",
+    "CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)",
+)
+
+
+class SharedState:
+    def __init__(self, path: str, timeout: float = 0.05):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # autocommit mode; transaction() opens explicit ones
+        self.db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.db.execute(statement)
+        self._seen = {}  # name -> last version this process acted on
+
+    @contextmanager
+    def transaction(self):
+        # IMMEDIATE takes the write lock up front, so read-modify-write
+        # sequences can't interleave between processes.
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.db
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def version(self, name: str) -> int:
+        row = self.db.execute("SELECT version FROM versions WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, name: str) -> int:
+        try:
+            version = self.db.execute(
+                "INSERT INTO versions (name, version) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET version = version + 1 RETURNING version",
+                (name,),
+            ).fetchone()[0]
+        except sqlite3.OperationalError:
+            metrics.inc("shared_state_errors")
+            return self._seen.get(name, 0)
+        # Our own change needs no reaction, but skipping ahead over someone
+        # else's bump would hide theirs; then the next changed() fires.
+        if self._seen.get(name, version - 1) == version - 1:
+            self._seen[name] = version
+        return version
+
+    def changed(self, name: str) -> bool:
+        # True once for every version bumped by another process since the
+        # last call. The first call only records where things stand.
+        try:
+            version = self.version(name)
+        except sqlite3.OperationalError:
+            metrics.inc("shared_state_errors")
+            return False
+        seen = self._seen.setdefault(name, version)
+        if version == seen:
+            return False
+        self._seen[name] = version
+        return True
+
+    def close(self):
+        self.db.close()
+
+
+class SharedRateLimiter:
+    # ratelimit.RateLimiter, with the buckets in SharedState. Wall-clock time
+    # rather than monotonic, since it is compared across processes.
+    def __init__(self, state: SharedState, rate: float = 0.5, burst: float = 3.0, max_users: int = 10_000):
+        self.state = state
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+
+    def __len__(self) -> int:
+        return self.state.db.execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+
+    def acquire(self, key, cost: float = 1.0) -> float:
+        now = time.time()
+        try:
+            with self.state.transaction() as db:
+                row = db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (str(key),)).fetchone()
+                tokens, last = row if row else (self.burst, now)
+                tokens = min(self.burst, tokens + max(0.0, now - last) * self.rate)
+                spent = tokens >= cost
+                db.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (str(key), tokens - cost if spent else tokens, now),
+                )
+        except sqlite3.OperationalError:
+            # locked past the timeout: let the command through
+            metrics.inc("shared_state_errors")
+            return 0.0
+        return 0.0 if spent else (cost - tokens) / self.rate
+
+    def sweep(self) -> int:
+        # Full buckets are what a new user gets anyway; past max_users the
+        # least recently used go too.
+        now = time.time()
+        try:
+            with self.state.transaction() as db:
+                removed = db.execute(
+                    "DELETE FROM buckets WHERE tokens + (? - updated) * ? >= ?", (now, self.rate, self.burst)
+                ).rowcount
+                removed += db.execute(
+                    "DELETE FROM buckets WHERE key IN (SELECT key FROM buckets ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                    (self.max_users,),
+                ).rowcount
+        except sqlite3.OperationalError:
+            metrics.inc("shared_state_errors")
+            return 0
+        return removed
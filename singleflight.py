@@ -0,0 +1,31 @@
+"""Coalesce concurrent identical jobs into one shared task.
+
+The first caller for a key starts the work; anyone asking for the same key
+while it runs awaits the same task instead of repeating it. Each caller gets
+the result (or exception) back and sends its own followup.
+"""
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # shield: one caller timing out or being cancelled must not kill the
+        # job for everybody else waiting on it
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
@@ -0,0 +1,29 @@
+"""Startup timeline.
+
+main.py imports this first, so the clock starts before discord.py and the
+rest are loaded, and app.py marks each phase as it finishes: imports, login,
+extensions, gateway ready, Mongo, the access cache, Pillow warm-up. The
+marks are printed once the bot is ready, shown in /stats and exported as
+the startup_seconds metric. For a per-module breakdown of the import phase,
+run `python -X importtime main.py`.
+"""
+import time
+
+from metrics import metrics
+
+STARTED = time.perf_counter()
+
+phases = {}  # phase -> seconds since STARTED, in the order they finished
+
+
+def mark(phase: str) -> float:
+    # Only the first time counts; on_ready, for one, fires again on reconnects.
+    if phase in phases:
+        return phases[phase]
+    elapsed = phases[phase] = time.perf_counter() - STARTED
+    metrics.observe("startup_seconds", elapsed, phase=phase, command="-")
+    return elapsed
+
+
+def summary() -> str:
+    return " · ".join(f"{phase} {seconds:.2f}s" for phase, seconds in phases.items())
@@ -0,0 +1,100 @@
+"""Font loading and text layout for rendered images.
+
+The font is resolved once (resolve_font is cached) and passed to jobs as a
+path; Pillow is only imported once a font is actually loaded. Inside each
+worker process, loaded fonts, wrapped lines and line metrics are kept in LRU
+caches, so repeat captions and quotes skip the FreeType load and the
+measuring.
+"""
+from functools import lru_cache
+
+# Tried in order when no font is configured. truetype() also searches the
+# system font directories for bare file names.
+FALLBACK_FONTS = (
+    "DejaVuSans-Bold.ttf",
+    "DejaVuSans.ttf",
+    "LiberationSans-Regular.ttf",
+    "arial.ttf",
+    "Arial.ttf",
+)
+
+
+@lru_cache(maxsize=None)
+def resolve_font(path: str = None):
+    # Returns a loadable font path, or None for Pillow's built-in scalable font.
+    from PIL import ImageFont
+    candidates = ([path] if path else []) + list(FALLBACK_FONTS)
+    for candidate in candidates:
+        try:
+            ImageFont.truetype(candidate, 12)
+        except OSError:
+            if candidate == path:
+                print(f"Font {path!r} could not be loaded, falling back.")
+            continue
+        return candidate
+    return None
+
+
+@lru_cache(maxsize=64)
+def get_font(path, size: int):
+    from PIL import ImageFont
+    if path:
+        return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size=size)
+
+
+@lru_cache(maxsize=256)
+def line_height(path, size: int) -> int:
+    ascent, descent = get_font(path, size).getmetrics()
+    return ascent + descent
+
+
+@lru_cache(maxsize=1024)
+def wrap(text: str, path, size: int, max_width: int, max_lines: int = None) -> tuple:
+    # Greedy word wrap. Stops once it has more than max_lines, which is
+    # enough for the caller to know the text overflows.
+    font = get_font(path, size)
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split(" "):
+            if max_lines and len(lines) > max_lines:
+                return tuple(lines)
+            candidate = f"{line} {word}" if line else word
+            if font.getlength(candidate) <= max_width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            # hard-break words that are wider than the whole column; no glyph is
+            # narrower than a pixel, so only the first max_width chars can fit
+            while font.getlength(word[:max_width + 1]) > max_width and len(word) > 1:
+                if max_lines and len(lines) > max_lines:
+                    return tuple(lines)
+                lo, hi = 1, min(len(word), max_width + 1) - 1
+                while lo < hi:
+                    mid = (lo + hi + 1) // 2
+                    if font.getlength(word[:mid]) <= max_width:
+                        lo = mid
+                    else:
+                        hi = mid - 1
+                lines.append(word[:lo])
+                word = word[lo:]
+            line = word
+        lines.append(line)
+    return tuple(lines)
+
+
+@lru_cache(maxsize=1024)
+def fit(text: str, path, max_width: int, max_size: int, min_size: int, max_lines: int) -> tuple:
+    # Largest size from max_size down whose wrap fits in max_lines. If even
+    # min_size overflows, the text is cut and the last line ends in "…".
+    size = max_size
+    while True:
+        lines = wrap(text, path, size, max_width, max_lines)
+        if len(lines) <= max_lines or size <= min_size:
+            break
+        size = max(min_size, int(size * 0.85))
+    if len(lines) > max_lines:
+        lines = lines[:max_lines - 1] + (lines[max_lines - 1][:-1] + "…",)
+    return size, lines